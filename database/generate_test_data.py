@@ -7,7 +7,10 @@ ERP Agent 测试数据生成脚本（确定性版本）
 特点：无随机性，每次运行生成相同数据
 """
 
+import io
+
 import psycopg2
+from psycopg2.extras import execute_values
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 
@@ -166,6 +169,12 @@ MISSING_SALARIES = [
     ('EMP092', date(2023, 11, 25))  # 王力宏 2023年11月
 ]
 
+# 数据截止日期（最后一次发薪日）
+DATA_END_DATE = date(2026, 1, 25)
+
+# 离职日期超过截止日期时使用的固定离职日期
+FALLBACK_LEAVE_DATE = date(2025, 6, 15)
+
 
 def connect_db():
     """连接数据库"""
@@ -182,8 +191,8 @@ def calculate_leave_date(hire_date, emp_id):
     leave_date = hire_date + timedelta(days=months_after_hire * 30)
     
     # 确保不超过当前日期
-    if leave_date > date(2026, 1, 25):
-        leave_date = date(2025, 6, 15)
+    if leave_date > DATA_END_DATE:
+        leave_date = FALLBACK_LEAVE_DATE
     
     return leave_date
 
@@ -214,62 +223,63 @@ def generate_employees():
 
 
 def generate_salaries(employees):
-    """生成工资记录（确定性）"""
+    """生成工资记录（确定性）
+    
+    以“年*12+月”的整数月序号遍历发薪月份，涨薪系数预先构造为Decimal常量，
+    避免每月重复构造date进行比较和Decimal(str(...))转换。
+    """
     salaries = []
     missing_set = set(MISSING_SALARIES)
+    high_raise_ids = set(HIGH_RAISE_EMPLOYEES)
+    annual_factor = Decimal(str(1 + ANNUAL_RAISE_RATE))
+    high_raise_factor = Decimal('1.40')  # 涨薪40%
+    a_dept_factor = Decimal(str(A_DEPT_MULTIPLIER))
+    high_raise_idx = 2025 * 12 + (6 - 1)
     
     for emp in employees:
         emp_id = emp['employee_id']
         hire_date = emp['hire_date']
         leave_date = emp['leave_date']
-        level = emp['current_level']
-        dept = emp['department_name']
         
         # 基础工资（确定性）
-        base_salary = Decimal(str(SALARY_BASE[level]))
-        if dept == 'A部门':
-            base_salary = base_salary * Decimal(str(A_DEPT_MULTIPLIER))
+        base_salary = Decimal(str(SALARY_BASE[emp['current_level']]))
+        if emp['department_name'] == 'A部门':
+            base_salary = base_salary * a_dept_factor
         
-        # 生成每月工资记录
-        current_date = date(hire_date.year, hire_date.month, 25)  # 每月25号发薪
-        if current_date < hire_date:
-            # 如果25号早于入职日期，发薪推迟到下个月
-            if current_date.month == 12:
-                current_date = date(current_date.year + 1, 1, 25)
-            else:
-                current_date = date(current_date.year, current_date.month + 1, 25)
+        # 每月25号发薪；如果25号早于入职日期，发薪推迟到下个月
+        start_idx = hire_date.year * 12 + (hire_date.month - 1)
+        if hire_date.day > 25:
+            start_idx += 1
         
-        end_date = leave_date if leave_date else date(2026, 1, 25)
+        end_date = leave_date if leave_date else DATA_END_DATE
+        end_idx = end_date.year * 12 + (end_date.month - 1)
+        if end_date.day < 25:
+            end_idx -= 1
         
         current_salary = base_salary
-        last_raise_year = hire_date.year - 1  # 确保第一年1月就能涨薪
+        has_high_raise = emp_id in high_raise_ids
         
-        while current_date <= end_date:
-            # 检查是否是拖欠工资月份
-            if (emp_id, current_date) in missing_set:
-                # 跳过这个月的工资
-                pass
-            else:
-                # 每年1月涨薪
-                if current_date.month == 1 and current_date.year > last_raise_year:
-                    current_salary = current_salary * Decimal(str(1 + ANNUAL_RAISE_RATE))
-                    last_raise_year = current_date.year
-                
-                # 特殊高涨薪
-                if emp_id in HIGH_RAISE_EMPLOYEES and current_date == date(2025, 6, 25):
-                    current_salary = current_salary * Decimal('1.40')  # 涨薪40%
-                
-                salaries.append({
-                    'employee_id': emp_id,
-                    'payment_date': current_date,
-                    'salary_amount': round(float(current_salary), 2)
-                })
+        for idx in range(start_idx, end_idx + 1):
+            year, month0 = divmod(idx, 12)
+            payment_date = date(year, month0 + 1, 25)
             
-            # 下一个月
-            if current_date.month == 12:
-                current_date = date(current_date.year + 1, 1, 25)
-            else:
-                current_date = date(current_date.year, current_date.month + 1, 25)
+            # 拖欠工资月份：跳过这个月的工资
+            if (emp_id, payment_date) in missing_set:
+                continue
+            
+            # 每年1月涨薪（每个1月只出现一次）
+            if month0 == 0:
+                current_salary = current_salary * annual_factor
+            
+            # 特殊高涨薪
+            if has_high_raise and idx == high_raise_idx:
+                current_salary = current_salary * high_raise_factor
+            
+            salaries.append({
+                'employee_id': emp_id,
+                'payment_date': payment_date,
+                'salary_amount': round(float(current_salary), 2)
+            })
     
     return salaries
 
@@ -277,52 +287,60 @@ def generate_salaries(employees):
 def insert_employees(conn, employees):
     """插入员工数据"""
     cursor = conn.cursor()
-    
-    for emp in employees:
-        cursor.execute("""
+    try:
+        # 一条语句发送全部员工行，避免逐行往返与重复解析
+        rows = [
+            (
+                emp['employee_id'],
+                emp['employee_name'],
+                emp['department_name'],
+                emp['current_level'],
+                emp['hire_date'],
+                emp['leave_date']
+            )
+            for emp in employees
+        ]
+        execute_values(cursor, """
             INSERT INTO employees 
             (employee_id, employee_name, department_name, current_level, hire_date, leave_date)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (
-            emp['employee_id'],
-            emp['employee_name'],
-            emp['department_name'],
-            emp['current_level'],
-            emp['hire_date'],
-            emp['leave_date']
-        ))
+            VALUES %s
+        """, rows, page_size=500)
+        
+        # 整个阶段只提交一次；失败时回滚，不留下部分数据
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
     
-    conn.commit()
-    cursor.close()
     print(f"✓ 成功插入 {len(employees)} 条员工记录")
 
 
 def insert_salaries(conn, salaries):
-    """批量插入工资数据"""
+    """批量插入工资数据（COPY FROM STDIN，绕过SQL解析）"""
     cursor = conn.cursor()
-    
-    # 批量插入
-    batch_size = 1000
-    for i in range(0, len(salaries), batch_size):
-        batch = salaries[i:i + batch_size]
+    try:
+        # 按COPY文本格式（制表符分隔）写入内存缓冲区
+        buf = io.StringIO()
+        for sal in salaries:
+            buf.write(
+                f"{sal['employee_id']}\t{sal['payment_date'].isoformat()}\t{sal['salary_amount']}\n"
+            )
+        buf.seek(0)
         
-        values = []
-        for sal in batch:
-            values.append(cursor.mogrify("(%s, %s, %s)", (
-                sal['employee_id'],
-                sal['payment_date'],
-                sal['salary_amount']
-            )).decode('utf-8'))
-        
-        query = f"""
-            INSERT INTO salaries (employee_id, payment_date, salary_amount)
-            VALUES {','.join(values)}
-        """
-        cursor.execute(query)
+        cursor.copy_expert(
+            "COPY salaries (employee_id, payment_date, salary_amount) FROM STDIN WITH (FORMAT text)",
+            buf
+        )
+        # 整个阶段只提交一次；失败时回滚，不留下部分数据
         conn.commit()
-        print(f"✓ 已插入 {i + len(batch)}/{len(salaries)} 条工资记录")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
     
-    cursor.close()
     print(f"✓ 成功插入 {len(salaries)} 条工资记录")
 
 
@@ -422,10 +422,11 @@ class ERPAgent:
                     state.error = f"达到最大迭代次数 ({self.agent_config.max_iterations})，未能完成查询"
                     
                     # 尝试基于现有结果生成答案
-                    if state.context and self._has_successful_query(state.context):
+                    sql_history = self._collect_successful_queries(state.context)
+                    if sql_history:
                         try:
                             state.final_answer = self._generate_fallback_answer(
-                                user_question, state.context
+                                user_question, sql_history
                             )
                             state.success = True
                             state.error = None
@@ -716,10 +717,11 @@ class ERPAgent:
                     state.error = f"达到最大迭代次数 ({self.agent_config.max_iterations})"
                     
                     # 尝试基于现有结果生成答案
-                    if state.context and self._has_successful_query(state.context):
+                    sql_history = self._collect_successful_queries(state.context)
+                    if sql_history:
                         try:
                             state.final_answer = self._generate_fallback_answer(
-                                user_question, state.context
+                                user_question, sql_history
                             )
                             state.success = True
                             state.error = None
@@ -794,45 +796,43 @@ class ERPAgent:
         else:
             return f"失败，错误: {exec_result['error']}"
     
-    def _has_successful_query(self, context: List[Dict[str, Any]]) -> bool:
+    def _collect_successful_queries(
+        self,
+        context: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
         """
-        检查上下文中是否有成功的查询
+        单次遍历执行上下文，提取所有成功的查询
+        
+        返回列表同时用于判断“是否有成功的查询”和生成备用答案，
+        避免对上下文重复遍历。
         
         参数:
             context: 执行上下文
             
         返回:
-            bool: 是否有成功的查询
+            List[Dict]: 成功查询的列表，每项包含 sql 和 result
         """
-        for item in context:
-            if 'result' in item and item['result'].get('success', False):
-                return True
-        return False
+        return [
+            {'sql': item.get('sql', ''), 'result': item['result']}
+            for item in context
+            if 'result' in item and item['result'].get('success', False)
+        ]
     
     def _generate_fallback_answer(
         self,
         user_question: str,
-        context: List[Dict[str, Any]]
+        sql_history: List[Dict[str, Any]]
     ) -> str:
         """
         生成备用答案（当达到最大迭代次数但有成功的查询时）
         
         参数:
             user_question: 用户问题
-            context: 执行上下文
+            sql_history: 成功查询的列表（由 _collect_successful_queries 提取）
             
         返回:
             str: 生成的答案
         """
-        # 提取成功的查询
-        sql_history = []
-        for item in context:
-            if 'result' in item and item['result'].get('success', False):
-                sql_history.append({
-                    'sql': item.get('sql', ''),
-                    'result': item['result']
-                })
-        
         if sql_history:
             # 尝试使用result_analyzer提取简单答案
             last_result = sql_history[-1]['result']
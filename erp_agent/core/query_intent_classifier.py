@@ -173,6 +173,12 @@ class QueryIntentClassifier:
                 }
             }
         }
+        
+        # 各意图的模式正则在初始化时编译一次，保存在私有字典中，不写回意图配置
+        self._compiled_patterns = {
+            intent: tuple((pattern, re.compile(pattern)) for pattern in config['patterns'])
+            for intent, config in self.intent_patterns.items()
+        }
     
     def classify(self, user_question: str) -> IntentAnalysis:
         """
@@ -203,18 +209,13 @@ class QueryIntentClassifier:
         matches = {}
         
         for intent, config in self.intent_patterns.items():
-            score = 0
-            matched_keywords = []
-            
             # 关键词匹配
-            for keyword in config['keywords']:
-                if keyword in user_question:
-                    score += 1
-                    matched_keywords.append(keyword)
+            matched_keywords = [keyword for keyword in config['keywords'] if keyword in user_question]
+            score = len(matched_keywords)
             
-            # 模式匹配
-            for pattern in config['patterns']:
-                if re.search(pattern, user_question):
+            # 模式匹配（使用初始化时预编译的正则）
+            for pattern, regex in self._compiled_patterns[intent]:
+                if regex.search(user_question):
                     score += 2  # 模式匹配权重更高
                     matched_keywords.append(f"pattern:{pattern[:20]}...")
             
@@ -8,6 +8,7 @@
 """
 
 import json
+import threading
 import time
 import requests
 from decimal import Decimal
@@ -18,6 +19,30 @@ from erp_agent.utils.date_utils import get_current_datetime
 from erp_agent.config.llm import LLMConfig
 
 
+# 降级解析使用的关键词（模块级常量，避免每次调用重新构建列表）
+_SUFFICIENT_KEYWORDS = ('充分', '足够', '完整', 'sufficient', 'enough', 'complete')
+_CONTINUE_KEYWORDS = ('不足', '缺少', '需要更多', '继续', 'insufficient', 'need more', 'continue')
+
+# 合法的下一步动作（只做成员检查，使用集合）
+_VALID_ACTIONS = frozenset({'generate_answer', 'continue_query', 'retry_query'})
+
+
+def _format_value(value: Any) -> str:
+    """降级答案中的取值格式：浮点数最多保留两位小数并去掉末尾的 0"""
+    if isinstance(value, float):
+        text = f"{value:.2f}"
+        return text.rstrip('0').rstrip('.') if '.' in text else text
+    return str(value)
+
+
+def _format_row(row: Dict[str, Any]) -> str:
+    """将一行结果格式化为“列为值”的自然语言描述"""
+    return "，".join(
+        f"{col}为空" if val is None else f"{col}为{_format_value(val)}"
+        for col, val in row.items()
+    )
+
+
 class ResultAnalyzer:
     """
     LLM驱动的结果分析器
@@ -59,6 +84,21 @@ class ResultAnalyzer:
         self.analysis_temperature = 0.3  # 分析时使用较低温度，保持客观
         self.analysis_max_tokens = 1024
         self.max_retries = 2  # 最大重试次数
+        
+        # 每个线程一个 HTTP 会话（requests.Session 不保证线程安全）
+        self._local = threading.local()
+    
+    @property
+    def _session(self) -> requests.Session:
+        """
+        当前线程的 HTTP 会话
+        
+        同一个分析器的多次 LLM 调用复用连接（keep-alive），避免每次重新建立 TCP/TLS 连接。
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
     
     @staticmethod
     def _serialize_data(data: Any) -> Any:
@@ -341,7 +381,7 @@ class ResultAnalyzer:
         }
         
         try:
-            response = requests.post(
+            response = self._session.post(
                 url,
                 headers=headers,
                 json=data,
@@ -495,8 +535,7 @@ class ResultAnalyzer:
             result['anomalies'] = []
         
         # 验证 next_action
-        valid_actions = ['generate_answer', 'continue_query', 'retry_query']
-        if result['next_action'] not in valid_actions:
+        if result['next_action'] not in _VALID_ACTIONS:
             # 根据 is_sufficient 推断
             result['next_action'] = 'generate_answer' if result['is_sufficient'] else 'continue_query'
         
@@ -514,18 +553,13 @@ class ResultAnalyzer:
         """
         response_lower = response.lower()
         
-        # 尝试检测是否认为结果充分
-        is_sufficient = any(keyword in response_lower for keyword in [
-            '充分', '足够', '完整', 'sufficient', 'enough', 'complete'
-        ])
+        # 需要继续查询时结果必然不充分，先检测继续查询的关键词，命中后无需再检测充分性
+        need_continue = any(keyword in response_lower for keyword in _CONTINUE_KEYWORDS)
         
-        # 尝试检测是否需要继续查询
-        need_continue = any(keyword in response_lower for keyword in [
-            '不足', '缺少', '需要更多', '继续', 'insufficient', 'need more', 'continue'
-        ])
-        
-        if need_continue:
-            is_sufficient = False
+        # 尝试检测是否认为结果充分
+        is_sufficient = not need_continue and any(
+            keyword in response_lower for keyword in _SUFFICIENT_KEYWORDS
+        )
         
         return {
             'is_sufficient': is_sufficient,
@@ -926,7 +960,7 @@ class ResultAnalyzer:
         }
         
         try:
-            response = requests.post(
+            response = self._session.post(
                 url,
                 headers=headers,
                 json=data,
@@ -1024,35 +1058,15 @@ class ResultAnalyzer:
         if not data:
             return "查询未返回任何结果。"
 
-        def format_value(value: Any) -> str:
-            if isinstance(value, float):
-                text = f"{value:.2f}"
-                return text.rstrip('0').rstrip('.') if '.' in text else text
-            return str(value)
-
         data = self._serialize_data(data)
 
         if row_count == 1:
             # 单行结果
-            row = data[0]
-            parts = []
-            for col, val in row.items():
-                if val is None:
-                    parts.append(f"{col}为空")
-                else:
-                    parts.append(f"{col}为{format_value(val)}")
-            return "查询结果：" + "，".join(parts)
+            return "查询结果：" + _format_row(data[0])
 
         # 多行结果：逐行自然语言列出
         lines = [f"查询返回 {row_count} 条记录："]
-        for i, row in enumerate(data, 1):
-            parts = []
-            for col, val in row.items():
-                if val is None:
-                    parts.append(f"{col}为空")
-                else:
-                    parts.append(f"{col}为{format_value(val)}")
-            lines.append(f"{i}. " + "，".join(parts))
+        lines.extend(f"{i}. {_format_row(row)}" for i, row in enumerate(data, 1))
         return "\n".join(lines)
     
     def should_continue_querying(
@@ -239,15 +239,16 @@ class SQLExecutor:
             str: 格式化的错误信息
         """
         error_msg = str(error).strip()
+        error_lower = error_msg.lower()
         
         # 提取关键错误信息
-        if 'syntax error' in error_msg.lower():
+        if 'syntax error' in error_lower:
             return f"SQL语法错误: {error_msg}"
-        elif 'does not exist' in error_msg.lower():
+        elif 'does not exist' in error_lower:
             return f"表或字段不存在: {error_msg}"
-        elif 'permission denied' in error_msg.lower():
+        elif 'permission denied' in error_lower:
             return f"权限不足: {error_msg}"
-        elif 'timeout' in error_msg.lower() or 'canceling statement' in error_msg.lower():
+        elif 'timeout' in error_lower or 'canceling statement' in error_lower:
             return f"查询超时（超过{self.timeout}秒）: {error_msg}"
         else:
             return f"数据库错误: {error_msg}"
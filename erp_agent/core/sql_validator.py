@@ -8,10 +8,21 @@ SQL 验证器模块
 """
 
 import re
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Pattern, Tuple
 from dataclasses import dataclass
 
 
+# 预编译的正则表达式（模块加载时编译一次）
+_LINE_COMMENT_RE = re.compile(r'--[^\n]*')
+_BLOCK_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+_WHITESPACE_RE = re.compile(r'\s+')
+_RELATION_NOT_FOUND_RE = re.compile(r'relation "(\w+)" does not exist')
+_COLUMN_NOT_FOUND_RE = re.compile(r'column "(\w+)" does not exist')
+
+# 错误模式的匹配标志
+_PATTERN_FLAGS = re.IGNORECASE | re.DOTALL
+
+
 @dataclass
 class ValidationResult:
     """SQL验证结果"""
@@ -59,6 +70,12 @@ class SQLValidator:
             # 注意：移除了过于简单的引号检查，因为它会误报
             # 更复杂的引号检查需要完整的SQL解析器
         ]
+        
+        # 错误模式的正则在初始化时编译一次，保存在私有列表中，不写回模式定义
+        self._compiled_patterns = [
+            (re.compile(pattern_def['pattern'], _PATTERN_FLAGS), pattern_def)
+            for pattern_def in self.error_patterns
+        ]
     
     def validate(self, sql: str) -> ValidationResult:
         """
@@ -74,8 +91,8 @@ class SQLValidator:
         sql_clean = self._clean_sql(sql)
         
         # 检查各种错误模式
-        for pattern_def in self.error_patterns:
-            if self._check_pattern(sql_clean, pattern_def):
+        for regex, pattern_def in self._compiled_patterns:
+            if self._check_pattern(sql_clean, regex):
                 # 尝试自动修复
                 fixed_sql = self._try_fix_sql(sql_clean, pattern_def)
                 
@@ -142,7 +159,7 @@ WHERE generate_series(...);  -- 这是错误的！
         
         elif 'relation' in error_lower and 'does not exist' in error_lower:
             # 提取表名
-            match = re.search(r'relation "(\w+)" does not exist', error_message)
+            match = _RELATION_NOT_FOUND_RE.search(error_message)
             table_name = match.group(1) if match else 'unknown'
             
             return {
@@ -155,7 +172,7 @@ WHERE generate_series(...);  -- 这是错误的！
         
         elif 'column' in error_lower and 'does not exist' in error_lower:
             # 提取列名
-            match = re.search(r'column "(\w+)" does not exist', error_message)
+            match = _COLUMN_NOT_FOUND_RE.search(error_message)
             column_name = match.group(1) if match else 'unknown'
             
             return {
@@ -196,18 +213,20 @@ WHERE generate_series(...);  -- 这是错误的！
     
     def _clean_sql(self, sql: str) -> str:
         """清理SQL：移除注释和规范化空白"""
+        # 先用 C 层的子串查找判断是否存在注释，大多数 SQL 不含注释，可跳过正则替换
         # 移除单行注释
-        sql = re.sub(r'--[^\n]*', '', sql)
+        if '--' in sql:
+            sql = _LINE_COMMENT_RE.sub('', sql)
         # 移除多行注释
-        sql = re.sub(r'/\*.*?\*/', '', sql, flags=re.DOTALL)
+        if '/*' in sql:
+            sql = _BLOCK_COMMENT_RE.sub('', sql)
         # 规范化空白
-        sql = re.sub(r'\s+', ' ', sql)
+        sql = _WHITESPACE_RE.sub(' ', sql)
         return sql.strip()
     
-    def _check_pattern(self, sql: str, pattern_def: Dict) -> bool:
-        """检查SQL是否匹配错误模式"""
-        pattern = pattern_def['pattern']
-        return bool(re.search(pattern, sql, re.IGNORECASE | re.DOTALL))
+    def _check_pattern(self, sql: str, regex: Pattern[str]) -> bool:
+        """检查SQL是否匹配错误模式（regex 为预编译的模式正则）"""
+        return regex.search(sql) is not None
     
     def _check_sql_structure(self, sql: str) -> Tuple[bool, Optional[str], Optional[str]]:
         """检查SQL基本结构（改进版：减少误报）"""
@@ -15,7 +15,6 @@ import time
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
 
 # 添加项目根目录到路径（erp_agent 文件夹的父目录）
 project_root = Path(__file__).parent.parent
@@ -305,6 +304,9 @@ def main():
     print("="*70)
     print("\n按 Ctrl+C 停止服务\n")
     
+    # 延迟导入：环境或数据库检查未通过时无需加载 uvicorn
+    import uvicorn
+    
     uvicorn.run(
         app,
         host="0.0.0.0",
@@ -8,6 +8,7 @@ ERP Agent 完整测试套件
 import unittest
 import sys
 import os
+import traceback
 from datetime import datetime
 from typing import Dict, Any
 
@@ -95,6 +96,16 @@ class TestDateUtils(unittest.TestCase):
         days = calculate_days_between('2025-01-01', '2026-01-01')
         self.assertEqual(days, 365)
     
+    def test_calculate_between_batch(self):
+        """测试批量计算天数差和月份差"""
+        from erp_agent.utils import calculate_days_between_batch, calculate_months_between_batch
+        
+        dates1 = ['2026-01-01', '2026-01-31', '2025-01-25']
+        dates2 = ['2026-01-31', '2026-01-01', '2026-03-25']
+        self.assertEqual(calculate_days_between_batch(dates1, dates2), [30, -30, 424])
+        self.assertEqual(calculate_months_between_batch(dates1, dates2), [0, 0, 14])
+        self.assertEqual(calculate_days_between_batch([], []), [])
+    
     def test_get_month_start_end(self):
         """测试获取月份起止"""
         from erp_agent.utils import get_month_start_end
@@ -366,6 +377,32 @@ class TestSQLExecutor(unittest.TestCase):
         )
         self.assertFalse(is_valid)
         self.assertIn('多条', error)
+    
+    def test_sql_validator_patterns(self):
+        """测试SQL验证器的错误模式检测（不修改模式定义）"""
+        from erp_agent.core.sql_validator import SQLValidator
+        
+        validator = SQLValidator()
+        before = [dict(pattern_def) for pattern_def in validator.error_patterns]
+        
+        result = validator.validate(
+            "SELECT * FROM employees WHERE hire_date IN (SELECT generate_series(1, 3));"
+        )
+        self.assertFalse(result.is_valid)
+        self.assertEqual(result.error_type, 'syntax_error')
+        self.assertTrue(validator.validate("SELECT COUNT(*) FROM employees;").is_valid)
+        self.assertEqual(validator.error_patterns, before)
+    
+    def test_query_intent_classifier(self):
+        """测试查询意图分类（不修改意图配置）"""
+        from erp_agent.core.query_intent_classifier import QueryIntentClassifier, QueryIntent
+        
+        classifier = QueryIntentClassifier()
+        before = {intent: dict(config) for intent, config in classifier.intent_patterns.items()}
+        
+        analysis = classifier.classify("列出所有部门的员工有哪些")
+        self.assertEqual(analysis.intent, QueryIntent.ENUMERATION)
+        self.assertEqual(classifier.intent_patterns, before)
 
 
 class TestPromptBuilder(unittest.TestCase):
@@ -421,6 +458,57 @@ class TestPromptBuilder(unittest.TestCase):
         self.assertIn('current_date', placeholders)
         self.assertIn('year', placeholders)
         self.assertEqual(len(placeholders), 2)
+        
+        # 返回列表，保留出现顺序和重复项
+        self.assertEqual(builder.extract_placeholders("{year}-{month}-{year}"), ['year', 'month', 'year'])
+    
+    def test_create_messages_for_api(self):
+        """测试创建 API 消息列表（历史记录可以是任意可迭代对象）"""
+        from erp_agent.utils import create_messages_for_api
+        
+        history = [{'role': 'user', 'content': '上一个问题'}, {'role': 'assistant', 'content': '上一个回答'}]
+        messages = create_messages_for_api("系统", "问题", (item for item in history))
+        
+        self.assertEqual(messages[0], {'role': 'system', 'content': '系统'})
+        self.assertEqual(messages[1:3], history)
+        self.assertEqual(messages[-1], {'role': 'user', 'content': '问题'})
+        self.assertEqual(len(create_messages_for_api("系统", "问题")), 2)
+    
+    def test_render_compiled_template(self):
+        """测试预编译模板的渲染结果与 str.format 一致"""
+        from erp_agent.utils.prompt_builder import _compile_template, _render, _LazyValues
+        
+        template = '{{"a": 1}} 今天是 {current_date}，今年是 {year:>6} 年 {name!r}'
+        values = {'current_date': '2026-01-25', 'year': 2026, 'name': '张三'}
+        
+        self.assertEqual(_render(_compile_template(template), values), template.format(**values))
+        with self.assertRaises(KeyError):
+            _render(_compile_template(template), {'year': 2026})
+        
+        # 惰性字典只计算模板引用的时间占位符
+        lazy = _LazyValues({'current_date': '2026-01-25', 'year': 2026, 'month': 1})
+        self.assertEqual(_render(_compile_template('{year_minus_1}'), lazy), '2025')
+        self.assertEqual(set(lazy), {'year_minus_1'})
+        self.assertEqual(lazy.get('month_padded'), '01')
+        self.assertIsNone(lazy.get('unknown'))
+    
+    def test_calculate_time_placeholders(self):
+        """测试时间占位符计算：None 计算所有，template_only 只计算模板中的占位符"""
+        from erp_agent.utils.prompt_builder import PromptBuilder, _PLACEHOLDER_COMPUTERS
+        from erp_agent.utils import get_current_datetime
+        
+        builder = PromptBuilder()
+        date_info = get_current_datetime()
+        
+        all_values = builder._calculate_time_placeholders(date_info)
+        self.assertTrue(set(_PLACEHOLDER_COMPUTERS) <= set(all_values))
+        
+        some = builder._calculate_time_placeholders(date_info, {'year_minus_1'})
+        self.assertEqual(set(some), {'current_date', 'year', 'month', 'year_minus_1'})
+        
+        template_values = builder._calculate_time_placeholders(date_info, template_only=True)
+        expected = (set(_PLACEHOLDER_COMPUTERS) & builder.get_template_placeholders()) | {'current_date', 'year', 'month'}
+        self.assertEqual(set(template_values), expected)
     
     def test_build_sql_generation_prompt(self):
         """测试构建SQL生成Prompt"""
@@ -487,6 +575,26 @@ class TestLogger(unittest.TestCase):
         # 测试记录日志
         logger.info("测试信息日志")
         logger.debug("测试调试日志")
+    
+    def test_time_based_rotation(self):
+        """测试按时间轮转的文件日志能正常写入"""
+        import tempfile
+        from loguru import logger
+        from erp_agent.utils import logger as logger_module
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            log_file = os.path.join(tmp_dir, 'rotation.log')
+            logger_module._logger_configured = False
+            try:
+                logger_module.setup_logger(log_file=log_file, rotation='1 day', enable_console=False)
+                logger.info("按时间轮转测试")
+            finally:
+                # 关闭文件 handler，后续测试重新初始化日志系统
+                logger.remove()
+                logger_module._logger_configured = False
+            
+            with open(log_file, encoding='utf-8') as f:
+                self.assertIn("按时间轮转测试", f.read())
 
 
 class TestIntegration(unittest.TestCase):
@@ -506,6 +614,24 @@ class TestIntegration(unittest.TestCase):
             raise unittest.SkipTest(
                 f"缺少必需的环境变量: {', '.join(missing_vars)}"
             )
+        
+        # 需要 Agent 的测试共用同一个实例（首次使用时创建）
+        cls._agent = None
+    
+    @classmethod
+    def tearDownClass(cls):
+        """释放共用的 Agent"""
+        cls._agent = None
+    
+    @classmethod
+    def get_agent(cls):
+        """获取共用的 Agent 实例，避免每个测试重复建立数据库连接、初始化 LLM 客户端和加载 Prompt"""
+        if cls._agent is None:
+            from erp_agent.core import ERPAgent
+            from erp_agent.config import get_llm_config, get_database_config, get_agent_config
+            
+            cls._agent = ERPAgent(get_llm_config(), get_database_config(), get_agent_config())
+        return cls._agent
     
     def test_database_connection(self):
         """测试数据库连接"""
@@ -538,15 +664,8 @@ class TestIntegration(unittest.TestCase):
     
     def test_agent_simple_query(self):
         """测试Agent简单查询"""
-        from erp_agent.core import ERPAgent
-        from erp_agent.config import get_llm_config, get_database_config, get_agent_config
-        
         try:
-            llm_config = get_llm_config()
-            db_config = get_database_config()
-            agent_config = get_agent_config()
-            
-            agent = ERPAgent(llm_config, db_config, agent_config)
+            agent = self.get_agent()
             
             # 执行简单查询
             result = agent.query("公司有多少在职员工？")
@@ -586,6 +705,109 @@ class TestQuestions(unittest.TestCase):
             # 验证问题内容不为空
             self.assertTrue(len(q['question']) > 0)
 
+    def test_question_lookup(self):
+        """测试按ID、分类、难度查找问题"""
+        from erp_agent.tests.test_questions import (
+            TEST_QUESTIONS,
+            get_question_by_id,
+            get_questions_by_category,
+            get_questions_by_difficulty
+        )
+
+        self.assertIsNone(get_question_by_id(999))
+        self.assertEqual(get_question_by_id(3)['id'], 3)
+
+        ranking_ids = [q['id'] for q in get_questions_by_category('ranking')]
+        self.assertEqual(ranking_ids, [3, 9])
+        self.assertEqual(get_questions_by_category('unknown'), [])
+
+        total = sum(
+            len(get_questions_by_difficulty(d)) for d in ('easy', 'medium', 'hard')
+        )
+        self.assertEqual(total, len(TEST_QUESTIONS))
+
+    def test_validate_result(self):
+        """测试各类型的结果验证"""
+        from erp_agent.tests.test_questions import validate_result
+
+        def ok(data, row_count=None):
+            return {
+                'success': True,
+                'data': data,
+                'row_count': len(data) if row_count is None else row_count
+            }
+
+        # numeric_range（列名模糊匹配）
+        passed, _, details = validate_result(1, ok([{'AVG_DAYS': 1100.0, 'avg_years': 3.01}]))
+        self.assertTrue(passed)
+        self.assertTrue(details['avg_days']['pass'])
+        self.assertTrue(validate_result(1, ok([{'average_days': 1100.0, 'years_avg': 3.01}]))[0])
+        passed, message, _ = validate_result(5, ok([{'avg_salary': 30000}]))
+        self.assertFalse(passed)
+        self.assertIn('avg_salary', message)
+
+        # table_data
+        rows = [
+            {'department_name': 'A部门', 'employee_count': 22},
+            {'department_name': 'B部门', 'employee_count': 20},
+            {'department_name': 'C部门', 'employee_count': 18},
+            {'department_name': 'D部门', 'employee_count': 16},
+            {'department_name': 'E部门', 'employee_count': 13},
+        ]
+        self.assertTrue(validate_result(2, ok(rows))[0])
+        rows[0] = {'department_name': 'A部门', 'employee_count': 30}
+        passed, message, _ = validate_result(2, ok(rows))
+        self.assertFalse(passed)
+        self.assertIn('A部门', message)
+        self.assertFalse(validate_result(2, ok(rows[:4]))[0])
+
+        level_rows = [
+            {'level': 1, 'avg_salary': 7749.18, 'employee_count': 6},
+            {'level': 2, 'avg_salary': 20000, 'employee_count': 15},
+        ]
+        passed, message, _ = validate_result(7, ok(level_rows, row_count=10))
+        self.assertFalse(passed)
+        self.assertIn('2 avg_salary', message)
+
+        # specific_value
+        row = {'department_name': 'E部门', 'avg_level': 5.2, 'employee_count': 13}
+        self.assertTrue(validate_result(3, ok([row]))[0])
+        passed, message, _ = validate_result(3, ok([dict(row, department_name='A部门')]))
+        self.assertFalse(passed)
+        self.assertIn('department_name', message)
+
+        # comparison
+        rows = [
+            {'department_name': 'A部门', 'avg_salary': 25802.85},
+            {'department_name': 'B部门', 'avg_salary': 24184.73},
+        ]
+        self.assertTrue(validate_result(6, ok(rows))[0])
+        rows[1]['avg_salary'] = 30000
+        self.assertFalse(validate_result(6, ok(rows))[0])
+
+        # top_n
+        top_ids = ['EMP029', 'EMP032', 'EMP055', 'EMP089', 'EMP003',
+                   'EMP011', 'EMP077', 'EMP059', 'EMP026', 'EMP062']
+        rows = [{'employee_id': eid, 'increase_amount': 100 - i} for i, eid in enumerate(top_ids)]
+        self.assertTrue(validate_result(9, ok(rows))[0])
+        self.assertFalse(validate_result(9, ok(rows[::-1]))[0])
+        self.assertFalse(validate_result(9, ok(rows[:5]))[0])
+
+        # existence_check
+        self.assertTrue(validate_result(10, ok([{'employee_id': 'EMP023'}], row_count=25))[0])
+        self.assertFalse(validate_result(10, ok([], row_count=3))[0])
+
+        # skip / 失败结果 / 未知问题
+        self.assertTrue(validate_result(8, ok([]))[0])
+        self.assertTrue(validate_result(8, {'success': False, 'error': 'GROUP BY'})[0])
+        passed, message, _ = validate_result(1, {'success': False})
+        self.assertFalse(passed)
+        self.assertIn('未知错误', message)
+        self.assertFalse(validate_result(999, ok([]))[0])
+        passed, message, _ = validate_result(1, ok(['not a dict']))
+        self.assertFalse(passed)
+        self.assertIn('验证过程出错', message)
+
 
 def run_unit_tests():
     """运行所有单元测试"""
@@ -696,7 +918,6 @@ def run_question_tests():
                 
             except Exception as e:
                 print(f"\n✗ 执行异常: {e}")
-                import traceback
                 traceback.print_exc()
                 
                 results['failed'] += 1
@@ -732,7 +953,6 @@ def run_question_tests():
         
     except Exception as e:
         print(f"\n❌ 测试问题执行失败: {e}")
-        import traceback
         traceback.print_exc()
         return None
 
@@ -5,7 +5,12 @@ ERP Agent 测试问题集（增强版）
 包含10个测试问题及其验证逻辑
 """
 
-from typing import Dict, Any, List, Optional, Tuple
+import re
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from itertools import islice
+from typing import Dict, Any, List, Mapping, Optional, Tuple
 
 
 # 10个测试问题及其标准答案/验证规则
@@ -186,6 +191,124 @@ TEST_QUESTIONS = [
 ]
 
 
+@dataclass(frozen=True, slots=True)
+class _ExpectedField:
+    """预处理后的期望字段（字段名小写形式和数值形式在导入时计算一次）"""
+    name: str
+    name_lower: str
+    value: Any
+    number: Optional[float]  # 数值型期望值的 float 形式，非数值为 None
+    aliases: Tuple[str, ...]  # 可直接按键查找的列名别名
+
+
+def _column_aliases(name: str) -> Tuple[str, ...]:
+    """
+    生成期望字段的常见列名别名
+    
+    示例:
+        'avg_days' -> ('avg_days', 'AVG_DAYS', 'average_days', 'days_avg')
+    """
+    aliases = [name, name.upper()]
+    if name.startswith('avg_'):
+        base = name[len('avg_'):]
+        aliases.extend([f'average_{base}', f'{base}_avg'])
+    return tuple(dict.fromkeys(aliases))
+
+
+def _to_number(val: Any) -> Optional[float]:
+    """数值型期望值转换为 float，非数值返回 None"""
+    return float(val) if isinstance(val, (int, float)) else None
+
+
+def _lower_fields(expected: Dict[str, Any]) -> Tuple[_ExpectedField, ...]:
+    """将期望值字典转换为预处理后的期望字段元组"""
+    return tuple(
+        _ExpectedField(key, key.lower(), val, _to_number(val), _column_aliases(key))
+        for key, val in expected.items()
+    )
+
+
+# 模块加载时一次性建立索引，查询时 O(1) 查找
+_BY_ID: Dict[int, Dict[str, Any]] = {q['id']: q for q in TEST_QUESTIONS}
+_BY_CATEGORY: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+_BY_DIFFICULTY: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+
+# 每个问题的列匹配表（期望字段名预先小写化）
+_EXPECTED_FIELDS: Dict[int, Tuple[_ExpectedField, ...]] = {}
+_EXPECTED_DATA_FIELDS: Dict[int, Dict[Any, Tuple[_ExpectedField, ...]]] = {}
+# 单值表格验证的期望数值: 键 -> float（非数值为 None）
+_EXPECTED_DATA_NUMBERS: Dict[int, Dict[Any, Optional[float]]] = {}
+# 多字段表格验证中出现的所有字段（去重后），用于一次性建立 字段 -> 列 映射
+_TABLE_FIELDS: Dict[int, Tuple[_ExpectedField, ...]] = {}
+
+# Top N 问题的期望员工ID集合
+_TOP_ID_SETS: Dict[int, frozenset] = {}
+
+for _q in TEST_QUESTIONS:
+    _BY_CATEGORY[_q['category']].append(_q)
+    _BY_DIFFICULTY[_q['difficulty']].append(_q)
+    
+    _validation = _q['validation']
+    if 'expected' in _validation:
+        _EXPECTED_FIELDS[_q['id']] = _lower_fields(_validation['expected'])
+    _EXPECTED_DATA_FIELDS[_q['id']] = {
+        key: _lower_fields(val)
+        for key, val in _validation.get('expected_data', {}).items()
+        if isinstance(val, dict)
+    }
+    _EXPECTED_DATA_NUMBERS[_q['id']] = {
+        key: _to_number(val)
+        for key, val in _validation.get('expected_data', {}).items()
+        if not isinstance(val, dict)
+    }
+    _TABLE_FIELDS[_q['id']] = tuple({
+        field.name: field
+        for fields in _EXPECTED_DATA_FIELDS[_q['id']].values()
+        for field in fields
+    }.values())
+    if _validation.get('type') == 'top_n':
+        _TOP_ID_SETS[_q['id']] = frozenset(_validation.get('top_employee_ids', ()))
+del _q, _validation
+
+
+# 按列名识别列角色的预编译模式（匹配小写列名，中文关键字不受大小写影响）
+_DEPARTMENT_COL_RE = re.compile(r'department|部门')
+_LEVEL_COL_RE = re.compile(r'level|级别')
+_VALUE_COL_RE = re.compile(r'count|salary|工资|人数')
+_SALARY_COL_RE = re.compile(r'salary|工资')
+_EMPLOYEE_ID_COL_RE = re.compile(r'employee_id|员工id')
+
+
+def _find_column(columns: List[Tuple[str, str]], pattern: re.Pattern) -> Optional[str]:
+    """按列顺序查找第一个列名匹配 pattern 的列，未找到返回 None"""
+    for col_lower, col in columns:
+        if pattern.search(col_lower):
+            return col
+    return None
+
+
+def _normalize_columns(row: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """每行只做一次列名小写化: [(小写列名, 原列名), ...]"""
+    return [(col.lower(), col) for col in row]
+
+
+def _match_column(columns: List[Tuple[str, str]], key_lower: str) -> Optional[str]:
+    """
+    按列顺序查找与期望字段互相包含的第一列
+    
+    Args:
+        columns: _normalize_columns 的结果
+        key_lower: 小写的期望字段名
+        
+    Returns:
+        匹配的原列名，未找到返回 None
+    """
+    for col_lower, col in columns:
+        if key_lower in col_lower or col_lower in key_lower:
+            return col
+    return None
+
+
 def get_question_by_id(question_id: int) -> Optional[Dict[str, Any]]:
     """
     根据问题ID获取问题信息
@@ -196,10 +319,7 @@ def get_question_by_id(question_id: int) -> Optional[Dict[str, Any]]:
     Returns:
         问题字典，如果未找到返回 None
     """
-    for q in TEST_QUESTIONS:
-        if q['id'] == question_id:
-            return q
-    return None
+    return _BY_ID.get(question_id)
 
 
 def get_questions_by_category(category: str) -> List[Dict[str, Any]]:
@@ -212,7 +332,7 @@ def get_questions_by_category(category: str) -> List[Dict[str, Any]]:
     Returns:
         问题列表
     """
-    return [q for q in TEST_QUESTIONS if q['category'] == category]
+    return list(_BY_CATEGORY.get(category, ()))
 
 
 def get_questions_by_difficulty(difficulty: str) -> List[Dict[str, Any]]:
@@ -225,7 +345,359 @@ def get_questions_by_difficulty(difficulty: str) -> List[Dict[str, Any]]:
     Returns:
         问题列表
     """
-    return [q for q in TEST_QUESTIONS if q['difficulty'] == difficulty]
+    return list(_BY_DIFFICULTY.get(difficulty, ()))
+
+
+def _compare_numeric(
+    actual_val: Any,
+    expected: float,
+    tol: float,
+    zero_max_diff: Optional[float] = None
+) -> Tuple[float, float, float, float]:
+    """
+    按相对容差比较数值
+    
+    Args:
+        actual_val: 实际值
+        expected: 期望值（导入时已转换为 float）
+        tol: 相对容差
+        zero_max_diff: 期望值不大于0时使用的绝对容差，None 表示始终使用相对容差
+        
+    Returns:
+        (实际值, 期望值, 差异, 允许的最大差异)，均为 float
+    """
+    actual = float(actual_val)
+    if zero_max_diff is not None and expected <= 0:
+        max_diff = zero_max_diff
+    else:
+        max_diff = expected * tol
+    return actual, expected, abs(actual - expected), max_diff
+
+
+def _validate_numeric_range(
+    question_id: int,
+    validation: Mapping[str, Any],
+    data: List[Dict[str, Any]],
+    row_count: int,
+    tol: float,
+    details: Dict[str, Any]
+) -> Tuple[bool, str, Dict[str, Any]]:
+    """验证数值范围：单行结果中各字段在容差范围内"""
+    expected_fields = _EXPECTED_FIELDS[question_id]
+    expected_rows = validation.get('row_count', 1)
+    
+    if row_count != expected_rows:
+        return False, f"行数不匹配: 期望{expected_rows}行, 实际{row_count}行", details
+    
+    if not data:
+        return False, "查询结果为空", details
+    
+    row = data[0]
+    columns = _normalize_columns(row)
+    mismatches = []
+    
+    for field in expected_fields:
+        key = field.name
+        expected_val = field.value
+        actual_val = next((row[alias] for alias in field.aliases if alias in row), None)
+        if actual_val is None:
+            # 别名都未命中时，再尝试其他可能的列名
+            col = _match_column(columns, field.name_lower)
+            if col is not None:
+                actual_val = row[col]
+        
+        if actual_val is None:
+            mismatches.append(f"缺少字段 {key}")
+            continue
+        
+        # 转换为浮点数进行比较
+        expected_number = field.number if field.number is not None else float(expected_val)
+        actual_val, expected_val, diff, max_diff = _compare_numeric(
+            actual_val, expected_number, tol
+        )
+        
+        details[key] = {
+            'expected': expected_val,
+            'actual': actual_val,
+            'diff': diff,
+            'max_diff': max_diff,
+            'pass': diff <= max_diff
+        }
+        
+        if diff > max_diff:
+            mismatches.append(
+                f"{key}: 期望{expected_val:.2f}, 实际{actual_val:.2f}, "
+                f"差异{diff:.2f} (超过容差{max_diff:.2f})"
+            )
+    
+    if mismatches:
+        return False, "数值不匹配: " + "; ".join(mismatches), details
+    return True, "验证通过", details
+
+
+def _validate_table_data(
+    question_id: int,
+    validation: Mapping[str, Any],
+    data: List[Dict[str, Any]],
+    row_count: int,
+    tol: float,
+    details: Dict[str, Any]
+) -> Tuple[bool, str, Dict[str, Any]]:
+    """验证表格数据：按部门/级别逐行比对期望值"""
+    expected_rows = validation['expected_rows']
+    expected_data = validation.get('expected_data', {})
+    expected_fields = _EXPECTED_DATA_FIELDS[question_id]
+    expected_numbers = _EXPECTED_DATA_NUMBERS[question_id]
+    
+    if row_count != expected_rows:
+        return False, f"行数不匹配: 期望{expected_rows}行, 实际{row_count}行", details
+    
+    # 查询结果各行列名相同，只需根据第一行确定一次各角色对应的列
+    columns = _normalize_columns(data[0]) if data else []
+    
+    # 键列（部门名、级别等）
+    key_col = None
+    key_is_level = False
+    for col_lower, col in columns:
+        if _DEPARTMENT_COL_RE.search(col_lower):
+            key_col = col
+            break
+        elif _LEVEL_COL_RE.search(col_lower):
+            key_col = col
+            key_is_level = True
+            break
+    
+    # 单值验证使用的数值列
+    value_col = _find_column(columns, _VALUE_COL_RE)
+    
+    # 多字段验证的 字段 -> 列 映射（对齐列名，整个结果集只计算一次）
+    field_cols = {
+        field.name: _match_column(columns, field.name_lower)
+        for field in _TABLE_FIELDS[question_id]
+    }
+    
+    # 验证具体数据（没有键列时无可比对的行）
+    mismatches = []
+    get_expected = expected_data.get
+    for row in (data if key_col is not None else ()):
+        # 个别行缺少键列时跳过该行
+        key = row.get(key_col)
+        if key is None:
+            continue
+        if key_is_level:
+            key = int(key)
+        
+        # 期望值不会为 None，一次 get 代替 in + 下标两次查找
+        expected_val = get_expected(key)
+        if expected_val is None:
+            continue
+        
+        # 根据期望值类型进行不同的验证
+        if isinstance(expected_val, dict):
+            # 多字段验证
+            for expected_field in expected_fields[key]:
+                field = expected_field.name
+                actual_val = row.get(field_cols[field])
+                
+                if actual_val is None:
+                    continue
+                
+                # 数值比较
+                if expected_field.number is not None:
+                    actual_val, exp_val, diff, max_diff = _compare_numeric(
+                        actual_val, expected_field.number, tol, zero_max_diff=1
+                    )
+                    
+                    if diff > max_diff:
+                        mismatches.append(
+                            f"{key} {field}: 期望{exp_val}, 实际{actual_val}"
+                        )
+        else:
+            # 单值验证
+            actual_val = row.get(value_col)
+            
+            expected_number = expected_numbers[key]
+            if actual_val is not None:
+                if expected_number is not None:
+                    actual_val, exp_val, diff, max_diff = _compare_numeric(
+                        actual_val, expected_number, tol, zero_max_diff=1
+                    )
+                    
+                    if diff > max_diff:
+                        mismatches.append(
+                            f"{key}: 期望{exp_val}, 实际{actual_val}"
+                        )
+    
+    if mismatches:
+        return False, "数据不匹配: " + "; ".join(mismatches), details
+    return True, "验证通过", details
+
+
+def _validate_specific_value(
+    question_id: int,
+    validation: Mapping[str, Any],
+    data: List[Dict[str, Any]],
+    row_count: int,
+    tol: float,
+    details: Dict[str, Any]
+) -> Tuple[bool, str, Dict[str, Any]]:
+    """验证特定值：单行结果中各字段与期望值一致"""
+    expected_fields = _EXPECTED_FIELDS[question_id]
+    expected_rows = validation.get('row_count', 1)
+    
+    if row_count != expected_rows:
+        return False, f"行数不匹配: 期望{expected_rows}行, 实际{row_count}行", details
+    
+    if not data:
+        return False, "查询结果为空", details
+    
+    row = data[0]
+    columns = _normalize_columns(row)
+    mismatches = []
+    
+    for field in expected_fields:
+        key = field.name
+        expected_val = field.value
+        col = _match_column(columns, field.name_lower)
+        actual_val = row[col] if col is not None else None
+        
+        if actual_val is None:
+            mismatches.append(f"缺少字段 {key}")
+            continue
+        
+        if field.number is not None:
+            actual_val, expected_val, diff, max_diff = _compare_numeric(
+                actual_val, field.number, tol
+            )
+            
+            if diff > max_diff:
+                mismatches.append(
+                    f"{key}: 期望{expected_val}, 实际{actual_val}"
+                )
+        else:
+            if str(actual_val) != str(expected_val):
+                mismatches.append(
+                    f"{key}: 期望{expected_val}, 实际{actual_val}"
+                )
+    
+    if mismatches:
+        return False, "值不匹配: " + "; ".join(mismatches), details
+    return True, "验证通过", details
+
+
+def _validate_comparison(
+    question_id: int,
+    validation: Mapping[str, Any],
+    data: List[Dict[str, Any]],
+    row_count: int,
+    tol: float,
+    details: Dict[str, Any]
+) -> Tuple[bool, str, Dict[str, Any]]:
+    """验证比较结果：工资最高的部门与期望一致"""
+    expected = validation['expected']
+    expected_rows = validation.get('row_count', 2)
+    
+    if row_count != expected_rows:
+        return False, f"行数不匹配: 期望{expected_rows}行, 实际{row_count}行", details
+    
+    # 确定部门列和工资列（同名多列时取最后一列）
+    dept_col = None
+    salary_col = None
+    for col_lower, col in (_normalize_columns(data[0]) if data else []):
+        if _DEPARTMENT_COL_RE.search(col_lower):
+            dept_col = col
+        elif _SALARY_COL_RE.search(col_lower):
+            salary_col = col
+    
+    # 检查哪个部门工资更高（遍历时顺便记录工资最高的部门）
+    dept_salaries = {}
+    actual_higher = None
+    highest_salary = None
+    for row in data:
+        dept = row.get(dept_col)
+        salary = float(row[salary_col]) if salary_col in row else None
+        
+        if dept and salary:
+            dept_salaries[dept] = salary
+            if highest_salary is None or salary > highest_salary:
+                actual_higher = dept
+                highest_salary = salary
+    
+    # 部门不重复时，遍历中记录的最高者即为最终结果
+    if len(dept_salaries) != expected_rows:
+        return False, f"部门数量不匹配", details
+    
+    expected_higher = expected['higher']
+    
+    if actual_higher != expected_higher:
+        return False, f"最高工资部门不匹配: 期望{expected_higher}, 实际{actual_higher}", details
+    
+    return True, "验证通过", details
+
+
+def _validate_top_n(
+    question_id: int,
+    validation: Mapping[str, Any],
+    data: List[Dict[str, Any]],
+    row_count: int,
+    tol: float,
+    details: Dict[str, Any]
+) -> Tuple[bool, str, Dict[str, Any]]:
+    """验证Top N结果：前N行的员工ID（及顺序）与期望一致"""
+    expected_rows = validation['expected_rows']
+    top_ids = validation.get('top_employee_ids', [])
+    check_order = validation.get('check_ordering', False)
+    
+    if row_count < expected_rows:
+        return False, f"行数不足: 期望至少{expected_rows}行, 实际{row_count}行", details
+    
+    # 根据第一行确定员工ID列，再提取前N行的员工ID
+    id_col = _find_column(_normalize_columns(data[0]), _EMPLOYEE_ID_COL_RE) if data else None
+    actual_ids = [row[id_col] for row in islice(data, expected_rows)] if id_col is not None else []
+    
+    if check_order:
+        # 严格检查顺序
+        if actual_ids != top_ids:
+            return False, f"Top {expected_rows}员工ID或顺序不匹配", details
+    else:
+        # 只检查集合是否匹配
+        if set(actual_ids) != _TOP_ID_SETS[question_id]:
+            return False, f"Top {expected_rows}员工ID集合不匹配", details
+    
+    return True, "验证通过", details
+
+
+def _validate_existence_check(
+    question_id: int,
+    validation: Mapping[str, Any],
+    data: List[Dict[str, Any]],
+    row_count: int,
+    tol: float,
+    details: Dict[str, Any]
+) -> Tuple[bool, str, Dict[str, Any]]:
+    """验证存在性检查：问题记录数量符合预期"""
+    min_rows = validation.get('min_rows', 1)
+    has_issues = validation.get('has_issues', True)
+    
+    if has_issues:
+        if row_count < min_rows:
+            return False, f"检测到的问题数量不足: 期望至少{min_rows}条, 实际{row_count}条", details
+    else:
+        if row_count > 0:
+            return False, f"不应该有问题记录, 但发现了{row_count}条", details
+    
+    return True, "验证通过", details
+
+
+# 验证类型 -> 验证函数
+_VALIDATORS = {
+    'numeric_range': _validate_numeric_range,
+    'table_data': _validate_table_data,
+    'specific_value': _validate_specific_value,
+    'comparison': _validate_comparison,
+    'top_n': _validate_top_n,
+    'existence_check': _validate_existence_check,
+}
 
 
 def validate_result(
@@ -251,6 +723,11 @@ def validate_result(
     validation = question.get('validation', {})
     val_type = validation.get('type')
     
+    # 跳过验证的问题无需检查执行结果
+    if val_type == 'skip':
+        reason = validation.get('reason', '未知原因')
+        return True, f"跳过验证: {reason}", {'validation_type': 'skip'}
+    
     # 检查SQL是否成功执行
     if not sql_result.get('success', False):
         return False, f"SQL执行失败: {sql_result.get('error', '未知错误')}", {}
@@ -268,280 +745,33 @@ def validate_result(
         'tolerance_used': tol
     }
     
-    try:
-        if val_type == 'skip':
-            return True, f"跳过验证: {validation.get('reason', '未知原因')}", details
-        
-        elif val_type == 'numeric_range':
-            # 验证数值范围
-            expected = validation['expected']
-            expected_rows = validation.get('row_count', 1)
-            
-            if row_count != expected_rows:
-                return False, f"行数不匹配: 期望{expected_rows}行, 实际{row_count}行", details
-            
-            if not data:
-                return False, "查询结果为空", details
-            
-            row = data[0]
-            mismatches = []
-            
-            for key, expected_val in expected.items():
-                actual_val = row.get(key)
-                if actual_val is None:
-                    # 尝试其他可能的列名
-                    for col in row.keys():
-                        if key.lower() in col.lower() or col.lower() in key.lower():
-                            actual_val = row[col]
-                            break
-                
-                if actual_val is None:
-                    mismatches.append(f"缺少字段 {key}")
-                    continue
-                
-                # 转换为浮点数进行比较
-                actual_val = float(actual_val)
-                expected_val = float(expected_val)
-                
-                diff = abs(actual_val - expected_val)
-                max_diff = expected_val * tol
-                
-                details[key] = {
-                    'expected': expected_val,
-                    'actual': actual_val,
-                    'diff': diff,
-                    'max_diff': max_diff,
-                    'pass': diff <= max_diff
-                }
-                
-                if diff > max_diff:
-                    mismatches.append(
-                        f"{key}: 期望{expected_val:.2f}, 实际{actual_val:.2f}, "
-                        f"差异{diff:.2f} (超过容差{max_diff:.2f})"
-                    )
-            
-            if mismatches:
-                return False, "数值不匹配: " + "; ".join(mismatches), details
-            return True, "验证通过", details
-        
-        elif val_type == 'table_data':
-            # 验证表格数据
-            expected_rows = validation['expected_rows']
-            expected_data = validation.get('expected_data', {})
-            
-            if row_count != expected_rows:
-                return False, f"行数不匹配: 期望{expected_rows}行, 实际{row_count}行", details
-            
-            # 验证具体数据
-            mismatches = []
-            for row in data:
-                # 获取键（部门名、级别等）
-                key = None
-                for col in row.keys():
-                    if 'department' in col.lower() or '部门' in col:
-                        key = row[col]
-                        break
-                    elif 'level' in col.lower() or '级别' in col:
-                        key = int(row[col])
-                        break
-                
-                if key is None:
-                    continue
-                
-                if key not in expected_data:
-                    continue
-                
-                expected_val = expected_data[key]
-                
-                # 根据期望值类型进行不同的验证
-                if isinstance(expected_val, dict):
-                    # 多字段验证
-                    for field, exp_val in expected_val.items():
-                        actual_val = None
-                        for col in row.keys():
-                            if field.lower() in col.lower() or col.lower() in field.lower():
-                                actual_val = row[col]
-                                break
-                        
-                        if actual_val is None:
-                            continue
-                        
-                        # 数值比较
-                        if isinstance(exp_val, (int, float)):
-                            actual_val = float(actual_val)
-                            exp_val = float(exp_val)
-                            diff = abs(actual_val - exp_val)
-                            max_diff = exp_val * tol if exp_val > 0 else 1
-                            
-                            if diff > max_diff:
-                                mismatches.append(
-                                    f"{key} {field}: 期望{exp_val}, 实际{actual_val}"
-                                )
-                else:
-                    # 单值验证
-                    actual_val = None
-                    for col in row.keys():
-                        if 'count' in col.lower() or 'salary' in col.lower() or '工资' in col or '人数' in col:
-                            actual_val = row[col]
-                            break
-                    
-                    if actual_val is not None:
-                        if isinstance(expected_val, (int, float)):
-                            actual_val = float(actual_val)
-                            exp_val = float(expected_val)
-                            diff = abs(actual_val - exp_val)
-                            max_diff = exp_val * tol if exp_val > 0 else 1
-                            
-                            if diff > max_diff:
-                                mismatches.append(
-                                    f"{key}: 期望{exp_val}, 实际{actual_val}"
-                                )
-            
-            if mismatches:
-                return False, "数据不匹配: " + "; ".join(mismatches), details
-            return True, "验证通过", details
-        
-        elif val_type == 'specific_value':
-            # 验证特定值
-            expected = validation['expected']
-            expected_rows = validation.get('row_count', 1)
-            
-            if row_count != expected_rows:
-                return False, f"行数不匹配: 期望{expected_rows}行, 实际{row_count}行", details
-            
-            if not data:
-                return False, "查询结果为空", details
-            
-            row = data[0]
-            mismatches = []
-            
-            for key, expected_val in expected.items():
-                actual_val = None
-                for col in row.keys():
-                    if key.lower() in col.lower() or col.lower() in key.lower():
-                        actual_val = row[col]
-                        break
-                
-                if actual_val is None:
-                    mismatches.append(f"缺少字段 {key}")
-                    continue
-                
-                if isinstance(expected_val, (int, float)):
-                    actual_val = float(actual_val)
-                    expected_val = float(expected_val)
-                    diff = abs(actual_val - expected_val)
-                    max_diff = expected_val * tol
-                    
-                    if diff > max_diff:
-                        mismatches.append(
-                            f"{key}: 期望{expected_val}, 实际{actual_val}"
-                        )
-                else:
-                    if str(actual_val) != str(expected_val):
-                        mismatches.append(
-                            f"{key}: 期望{expected_val}, 实际{actual_val}"
-                        )
-            
-            if mismatches:
-                return False, "值不匹配: " + "; ".join(mismatches), details
-            return True, "验证通过", details
-        
-        elif val_type == 'comparison':
-            # 验证比较结果
-            expected = validation['expected']
-            expected_rows = validation.get('row_count', 2)
-            
-            if row_count != expected_rows:
-                return False, f"行数不匹配: 期望{expected_rows}行, 实际{row_count}行", details
-            
-            # 检查哪个部门工资更高
-            dept_salaries = {}
-            for row in data:
-                dept = None
-                salary = None
-                for col, val in row.items():
-                    if 'department' in col.lower() or '部门' in col:
-                        dept = val
-                    elif 'salary' in col.lower() or '工资' in col:
-                        salary = float(val)
-                
-                if dept and salary:
-                    dept_salaries[dept] = salary
-            
-            if len(dept_salaries) != expected_rows:
-                return False, f"部门数量不匹配", details
-            
-            # 找出工资最高的部门
-            actual_higher = max(dept_salaries, key=dept_salaries.get)
-            expected_higher = expected['higher']
-            
-            if actual_higher != expected_higher:
-                return False, f"最高工资部门不匹配: 期望{expected_higher}, 实际{actual_higher}", details
-            
-            return True, "验证通过", details
-        
-        elif val_type == 'top_n':
-            # 验证Top N结果
-            expected_rows = validation['expected_rows']
-            top_ids = validation.get('top_employee_ids', [])
-            check_order = validation.get('check_ordering', False)
-            
-            if row_count < expected_rows:
-                return False, f"行数不足: 期望至少{expected_rows}行, 实际{row_count}行", details
-            
-            # 提取实际的员工ID
-            actual_ids = []
-            for row in data[:expected_rows]:
-                for col, val in row.items():
-                    if 'employee_id' in col.lower() or '员工id' in col:
-                        actual_ids.append(val)
-                        break
-            
-            if check_order:
-                # 严格检查顺序
-                if actual_ids != top_ids:
-                    return False, f"Top {expected_rows}员工ID或顺序不匹配", details
-            else:
-                # 只检查集合是否匹配
-                if set(actual_ids) != set(top_ids):
-                    return False, f"Top {expected_rows}员工ID集合不匹配", details
-            
-            return True, "验证通过", details
-        
-        elif val_type == 'existence_check':
-            # 验证存在性检查
-            min_rows = validation.get('min_rows', 1)
-            has_issues = validation.get('has_issues', True)
-            
-            if has_issues:
-                if row_count < min_rows:
-                    return False, f"检测到的问题数量不足: 期望至少{min_rows}条, 实际{row_count}条", details
-            else:
-                if row_count > 0:
-                    return False, f"不应该有问题记录, 但发现了{row_count}条", details
-            
-            return True, "验证通过", details
-        
-        else:
-            return False, f"未知的验证类型: {val_type}", details
+    validator = _VALIDATORS.get(val_type)
+    if validator is None:
+        return False, f"未知的验证类型: {val_type}", details
     
+    try:
+        return validator(question_id, validation, data, row_count, tol, details)
     except Exception as e:
         return False, f"验证过程出错: {str(e)}", details
 
 
 def print_all_questions():
-    """打印所有测试问题"""
-    print("=" * 70)
-    print("ERP Agent 测试问题集")
-    print("=" * 70)
+    """打印所有测试问题（先拼接再一次性输出）"""
+    lines = [
+        "=" * 70,
+        "ERP Agent 测试问题集",
+        "=" * 70,
+    ]
     
     for q in TEST_QUESTIONS:
-        print(f"\n问题 {q['id']}: {q['question']}")
-        print(f"  分类: {q['category']}")
-        print(f"  难度: {q['difficulty']}")
-        print(f"  描述: {q['description']}")
+        lines.append(f"\n问题 {q['id']}: {q['question']}")
+        lines.append(f"  分类: {q['category']}")
+        lines.append(f"  难度: {q['difficulty']}")
+        lines.append(f"  描述: {q['description']}")
         if q['validation'].get('type') == 'skip':
-            print(f"  ⚠️  {q['validation'].get('reason')}")
+            lines.append(f"  ⚠️  {q['validation'].get('reason')}")
+    
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 if __name__ == '__main__':
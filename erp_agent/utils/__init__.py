@@ -1,62 +1,58 @@
 """
 工具模块
 包含时间处理工具、Prompt构建工具和日志工具
+
+子模块按需加载（PEP 562）：首次访问某个导出名称时才导入对应子模块，
+只使用 get_logger 的脚本不必加载 prompt_builder 等模块。
 """
 
-# 导入泛化的时间工具
-from .date_utils import (
-    get_current_datetime,
-    calculate_date_offset,
-    get_date_range_for_period,
-    calculate_days_between,
-    calculate_months_between,
-    get_month_start_end,
-    get_quarter_start_end,
-    get_year_start_end,
-    format_date_for_sql
-)
-
-from .prompt_builder import (
-    PromptBuilder,
-    create_user_message,
-    create_system_message,
-    create_messages_for_api
-)
-
-from .logger import (
-    setup_logger,
-    get_logger,
-    log_sql_execution,
-    log_api_call,
-    log_agent_iteration,
-    log_error_with_context,
-    log_performance
-)
-
-__all__ = [
+import importlib
+
+# 导出名称 -> 所在子模块
+_EXPORTS = {
     # date_utils (泛化版本)
-    'get_current_datetime',
-    'calculate_date_offset',
-    'get_date_range_for_period',
-    'calculate_days_between',
-    'calculate_months_between',
-    'get_month_start_end',
-    'get_quarter_start_end',
-    'get_year_start_end',
-    'format_date_for_sql',
-    
+    'get_current_datetime': '.date_utils',
+    'calculate_date_offset': '.date_utils',
+    'get_date_range_for_period': '.date_utils',
+    'calculate_days_between': '.date_utils',
+    'calculate_months_between': '.date_utils',
+    'calculate_days_between_batch': '.date_utils',
+    'calculate_months_between_batch': '.date_utils',
+    'get_month_start_end': '.date_utils',
+    'get_quarter_start_end': '.date_utils',
+    'get_year_start_end': '.date_utils',
+    'format_date_for_sql': '.date_utils',
+
     # prompt_builder
-    'PromptBuilder',
-    'create_user_message',
-    'create_system_message',
-    'create_messages_for_api',
-    
+    'PromptBuilder': '.prompt_builder',
+    'create_user_message': '.prompt_builder',
+    'create_system_message': '.prompt_builder',
+    'create_messages_for_api': '.prompt_builder',
+
     # logger
-    'setup_logger',
-    'get_logger',
-    'log_sql_execution',
-    'log_api_call',
-    'log_agent_iteration',
-    'log_error_with_context',
-    'log_performance',
-]
+    'setup_logger': '.logger',
+    'get_logger': '.logger',
+    'log_sql_execution': '.logger',
+    'log_api_call': '.logger',
+    'log_agent_iteration': '.logger',
+    'log_error_with_context': '.logger',
+    'log_performance': '.logger',
+}
+
+# 导出列表与 _EXPORTS 保持一致，使用不可变的元组
+__all__ = tuple(_EXPORTS)
+
+
+def __getattr__(name):
+    """首次访问导出名称时导入对应子模块，并缓存到模块命名空间"""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
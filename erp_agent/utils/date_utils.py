@@ -9,9 +9,90 @@
 - 工具负责：提供基础的日期计算 API（偏移、范围、差值等）
 """
 
-from datetime import datetime, timedelta
-from calendar import monthrange
-from typing import Tuple, Optional, Dict
+import functools
+import re
+import time
+from datetime import datetime
+from typing import Tuple, Optional, Dict, Iterable, List
+
+
+# 平年各月天数
+_MDAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# 零填充的日、月字符串，按数值下标取用，省去 :02d 格式化
+_DD = tuple(f"{i:02d}" for i in range(32))
+_MM = tuple(f"{i:02d}" for i in range(13))
+
+# 各季度的 (起始月, 结束月, 结束日)；季度末分别是 3/31、6/30、9/30、12/31，与闰年无关
+_QUARTER_RANGES = (('01', '03', '31'), ('04', '06', '30'), ('07', '09', '30'), ('10', '12', '31'))
+
+# format_date_for_sql 支持的写法：带分隔符（可带时间部分）和紧凑的 YYYYMMDD
+_DATE_RE = re.compile(r'^\s*(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})(?:[ T]\d{1,2}:\d{2}:\d{2})?\s*$')
+_COMPACT_RE = re.compile(r'^\s*(\d{4})(\d{2})(\d{2})\s*$')
+
+# 星期名称，按 datetime.weekday() 下标取用（周一为 0）
+_EN_WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+_CN_WEEKDAYS = ('周一', '周二', '周三', '周四', '周五', '周六', '周日')
+
+# get_current_datetime 的秒级缓存：(整数秒, 结果字典)
+# 整体作为一个元组替换，其他线程不会读到秒数与字典不一致的中间状态
+_LAST_SEC: Tuple[Optional[int], Optional[Dict]] = (None, None)
+
+
+def _days_in_month(year: int, month: int) -> int:
+    """
+    指定年月的天数（month 需在 1-12 之间，由调用方保证）
+    
+    闰年判断 y%4==0 and (y%100!=0 or y%400==0) 改写为位运算形式:
+    y%4 -> y&3，能被4整除时 y%100!=0 等价于 y%25!=0，y%400==0 等价于 y&15==0
+    """
+    if month != 2:
+        return _MDAYS[month - 1]
+    return 29 if (year & 3) == 0 and (year % 25 != 0 or (year & 15) == 0) else 28
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_ymd(date_str: str) -> Tuple[int, int, int]:
+    """
+    解析 'YYYY-MM-DD' 格式的日期为 (年, 月, 日) 整数
+    
+    标准的零填充格式直接按位置切片转换，不创建日期对象；
+    其他写法（如 '2026-1-5'）或非法日期回退到 strptime，
+    接受的输入和抛出的 ValueError 与之前一致。
+    """
+    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-' and date_str.isascii():
+        y, m, d = date_str[0:4], date_str[5:7], date_str[8:10]
+        if y.isdigit() and m.isdigit() and d.isdigit():
+            year, month, day = int(y), int(m), int(d)
+            if year >= 1 and 1 <= month <= 12 and 1 <= day <= _days_in_month(year, month):
+                return year, month, day
+    dt = datetime.strptime(date_str, '%Y-%m-%d')
+    return dt.year, dt.month, dt.day
+
+
+def _to_rd(year: int, month: int, day: int) -> int:
+    """
+    日期转换为自 0000-03-01 起的天数
+    
+    以3月为一年的第一个月，闰日落在年末，月份天数可用 (153*m+2)//5 统一计算，
+    无需查表或判断闰年分支。
+    """
+    if month <= 2:
+        year -= 1
+        month += 12
+    return 365 * year + year // 4 - year // 100 + year // 400 + (153 * (month - 3) + 2) // 5 + day - 1
+
+
+def _from_rd(n: int) -> Tuple[int, int, int]:
+    """_to_rd 的逆运算：天数转换为 (年, 月, 日)"""
+    era, day_of_era = divmod(n, 146097)
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    mp = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * mp + 2) // 5 + 1
+    month = mp + 3 if mp < 10 else mp - 9
+    year = year_of_era + era * 400 + (1 if month <= 2 else 0)
+    return year, month, day
 
 
 def get_current_datetime() -> Dict[str, any]:
@@ -37,20 +118,34 @@ def get_current_datetime() -> Dict[str, any]:
             'minute': 30
         }
     """
-    now = datetime.now()
-    weekday_names = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
+    # 同一秒内的多次调用直接复用上次结果（返回副本，调用方可自由修改）
+    global _LAST_SEC
+    
+    ts = time.time()
+    sec = int(ts)
+    cached_sec, cached_info = _LAST_SEC
+    if sec == cached_sec:
+        return cached_info.copy()
+    
+    now = datetime.fromtimestamp(ts)
+    weekday = now.weekday()
     
-    return {
-        'current_date': now.strftime('%Y-%m-%d'),
-        'current_datetime': now.strftime('%Y-%m-%d %H:%M:%S'),
+    # 格式固定，直接拼接字符串，不经过 strftime 的 locale 处理
+    current_date = f"{now.year:04d}-{_MM[now.month]}-{_DD[now.day]}"
+    
+    info = {
+        'current_date': current_date,
+        'current_datetime': f"{current_date} {now.hour:02d}:{now.minute:02d}:{now.second:02d}",
         'year': now.year,
         'month': now.month,
         'day': now.day,
-        'weekday': now.strftime('%A'),
-        'weekday_cn': weekday_names[now.weekday()],
+        'weekday': _EN_WEEKDAYS[weekday],
+        'weekday_cn': _CN_WEEKDAYS[weekday],
         'hour': now.hour,
         'minute': now.minute
     }
+    _LAST_SEC = (sec, info)
+    return info.copy()
 
 
 def calculate_date_offset(
@@ -86,29 +181,28 @@ def calculate_date_offset(
         calculate_date_offset('2026-01-31', months=-1)
         # -> '2025-12-31'（自动处理月末）
     """
-    dt = datetime.strptime(base_date, '%Y-%m-%d')
+    base_year, base_month, base_day = _parse_ymd(base_date)
     
     # 计算年份和月份偏移
-    target_year = dt.year + years
-    target_month = dt.month + months
+    target_year = base_year + years
+    target_month = base_month + months
     
-    # 处理月份溢出
-    while target_month > 12:
-        target_month -= 12
-        target_year += 1
-    while target_month < 1:
-        target_month += 12
-        target_year -= 1
+    # 处理月份溢出（divmod 一步折算进位，任意偏移量都是 O(1)）
+    carry, month_index = divmod(target_month - 1, 12)
+    target_month = month_index + 1
+    target_year += carry
     
     # 确保日期有效（处理月末的情况，如1月31日 -> 2月末）
-    max_day = monthrange(target_year, target_month)[1]
-    target_day = min(dt.day, max_day)
+    max_day = _days_in_month(target_year, target_month)
+    target_day = min(base_day, max_day)
     
-    # 创建新日期并加上天数偏移
-    result = datetime(target_year, target_month, target_day)
-    result += timedelta(days=days)
+    # 天数偏移在天数表示上做整数加法
+    if days:
+        target_year, target_month, target_day = _from_rd(
+            _to_rd(target_year, target_month, target_day) + days
+        )
     
-    return result.strftime('%Y-%m-%d')
+    return f"{target_year:04d}-{_MM[target_month]}-{_DD[target_day]}"
 
 
 def get_date_range_for_period(
@@ -148,10 +242,10 @@ def get_date_range_for_period(
         # 返回指定月份的范围
         if not 1 <= month <= 12:
             raise ValueError(f"月份必须在 1-12 之间，得到: {month}")
-        days = monthrange(year, month)[1]
+        days = _days_in_month(year, month)
         return (
-            f"{year}-{month:02d}-01",
-            f"{year}-{month:02d}-{days:02d}"
+            f"{year}-{_MM[month]}-01",
+            f"{year}-{_MM[month]}-{_DD[days]}"
         )
     elif quarter is not None:
         # 返回指定季度的范围
@@ -159,10 +253,10 @@ def get_date_range_for_period(
             raise ValueError(f"季度必须在 1-4 之间，得到: {quarter}")
         start_month = (quarter - 1) * 3 + 1
         end_month = quarter * 3
-        end_days = monthrange(year, end_month)[1]
+        end_days = _days_in_month(year, end_month)
         return (
-            f"{year}-{start_month:02d}-01",
-            f"{year}-{end_month:02d}-{end_days:02d}"
+            f"{year}-{_MM[start_month]}-01",
+            f"{year}-{_MM[end_month]}-{_DD[end_days]}"
         )
     else:
         # 返回整年的范围
@@ -193,9 +287,7 @@ def calculate_days_between(date1: str, date2: str) -> int:
         calculate_days_between('2025-01-01', '2026-01-01')
         # -> 365
     """
-    d1 = datetime.strptime(date1, '%Y-%m-%d')
-    d2 = datetime.strptime(date2, '%Y-%m-%d')
-    return (d2 - d1).days
+    return _to_rd(*_parse_ymd(date2)) - _to_rd(*_parse_ymd(date1))
 
 
 def calculate_months_between(date1: str, date2: str) -> int:
@@ -216,10 +308,53 @@ def calculate_months_between(date1: str, date2: str) -> int:
         calculate_months_between('2025-01-25', '2026-01-25')
         # -> 12
     """
-    d1 = datetime.strptime(date1, '%Y-%m-%d')
-    d2 = datetime.strptime(date2, '%Y-%m-%d')
+    year1, month1, _ = _parse_ymd(date1)
+    year2, month2, _ = _parse_ymd(date2)
     
-    return (d2.year - d1.year) * 12 + (d2.month - d1.month)
+    return (year2 - year1) * 12 + (month2 - month1)
+
+
+def calculate_days_between_batch(dates1: Iterable[str], dates2: Iterable[str]) -> List[int]:
+    """
+    批量计算天数差，逐对等价于 calculate_days_between
+    
+    参数:
+        dates1: 第一组日期，格式 'YYYY-MM-DD'
+        dates2: 第二组日期，格式 'YYYY-MM-DD'，与 dates1 按位置配对
+    
+    返回:
+        list: 每对日期的天数差（date2 - date1）
+    
+    示例:
+        calculate_days_between_batch(['2026-01-01', '2025-01-01'], ['2026-01-31', '2026-01-01'])
+        # -> [30, 365]
+    """
+    parse, to_rd = _parse_ymd, _to_rd
+    return [to_rd(*parse(d2)) - to_rd(*parse(d1)) for d1, d2 in zip(dates1, dates2)]
+
+
+def calculate_months_between_batch(dates1: Iterable[str], dates2: Iterable[str]) -> List[int]:
+    """
+    批量计算月份差，逐对等价于 calculate_months_between
+    
+    参数:
+        dates1: 第一组日期，格式 'YYYY-MM-DD'
+        dates2: 第二组日期，格式 'YYYY-MM-DD'，与 dates1 按位置配对
+    
+    返回:
+        list: 每对日期的月份差（date2 - date1）
+    
+    示例:
+        calculate_months_between_batch(['2026-01-25'], ['2026-03-25'])
+        # -> [2]
+    """
+    parse = _parse_ymd
+    result = []
+    for d1, d2 in zip(dates1, dates2):
+        year1, month1, _ = parse(d1)
+        year2, month2, _ = parse(d2)
+        result.append((year2 - year1) * 12 + (month2 - month1))
+    return result
 
 
 def get_month_start_end(date: str) -> Tuple[str, str]:
@@ -239,11 +374,11 @@ def get_month_start_end(date: str) -> Tuple[str, str]:
         get_month_start_end('2024-02-20')
         # -> ('2024-02-01', '2024-02-29')（闰年）
     """
-    dt = datetime.strptime(date, '%Y-%m-%d')
-    days = monthrange(dt.year, dt.month)[1]
+    year, month, _ = _parse_ymd(date)
+    days = _days_in_month(year, month)
     return (
-        f"{dt.year}-{dt.month:02d}-01",
-        f"{dt.year}-{dt.month:02d}-{days:02d}"
+        f"{year}-{_MM[month]}-01",
+        f"{year}-{_MM[month]}-{_DD[days]}"
     )
 
 
@@ -264,9 +399,12 @@ def get_quarter_start_end(date: str) -> Tuple[str, str]:
         get_quarter_start_end('2026-11-20')
         # -> ('2026-10-01', '2026-12-31')（第4季度）
     """
-    dt = datetime.strptime(date, '%Y-%m-%d')
-    quarter = (dt.month - 1) // 3 + 1
-    return get_date_range_for_period(dt.year, quarter=quarter)
+    year, month, _ = _parse_ymd(date)
+    start_month, end_month, end_day = _QUARTER_RANGES[(month - 1) // 3]
+    return (
+        f"{year}-{start_month}-01",
+        f"{year}-{end_month}-{end_day}"
+    )
 
 
 def get_year_start_end(date: str) -> Tuple[str, str]:
@@ -283,10 +421,38 @@ def get_year_start_end(date: str) -> Tuple[str, str]:
         get_year_start_end('2026-06-15')
         # -> ('2026-01-01', '2026-12-31')
     """
-    dt = datetime.strptime(date, '%Y-%m-%d')
-    return get_date_range_for_period(dt.year)
+    # 年份范围只依赖年份，直接拼接；_parse_ymd 仍负责校验输入
+    year = _parse_ymd(date)[0]
+    return (f"{year}-01-01", f"{year}-12-31")
 
 
+def _fast_parse(date_str: str) -> Optional[Tuple[int, int, int]]:
+    """
+    单次遍历字符串，取出前三组连续数字
+    
+    数字逐位累加为整数，任意非数字字符都视为分隔符，
+    不生成中间字符串，也不依赖异常。不足三组数字时返回 None。
+    """
+    out = [0, 0, 0]
+    k = 0
+    in_digits = False
+    for ch in date_str:
+        if '0' <= ch <= '9':
+            out[k] = out[k] * 10 + (ord(ch) - 48)
+            in_digits = True
+        elif in_digits:
+            k += 1
+            in_digits = False
+            if k == 3:
+                break
+    if in_digits:
+        k += 1
+    if k < 3:
+        return None
+    return out[0], out[1], out[2]
+
+
+@functools.lru_cache(maxsize=1024)
 def format_date_for_sql(date_str: str) -> str:
     """
     将各种格式的日期字符串标准化为 SQL 格式
@@ -303,37 +469,19 @@ def format_date_for_sql(date_str: str) -> str:
         format_date_for_sql("2026.1.5") -> "2026-01-05"
         format_date_for_sql("20260105") -> "2026-01-05"
     """
-    # 尝试多种日期格式
-    formats = [
-        '%Y-%m-%d',
-        '%Y/%m/%d',
-        '%Y.%m.%d',
-        '%Y%m%d',
-        '%Y-%m-%d %H:%M:%S',
-        '%Y/%m/%d %H:%M:%S'
-    ]
-    
-    for fmt in formats:
-        try:
-            dt = datetime.strptime(date_str, fmt)
-            return dt.strftime('%Y-%m-%d')
-        except ValueError:
-            continue
-    
-    # 如果都失败了,尝试解析更灵活的格式
-    try:
-        # 替换分隔符为统一的 -
-        normalized = date_str.strip()
-        for sep in ['/', '.', ' ']:
-            normalized = normalized.replace(sep, '-')
-        # 分割年月日
-        parts = normalized.split('-')
-        if len(parts) >= 3:
-            year, month, day = parts[0], parts[1], parts[2]
-            # 补零
-            return f"{int(year):04d}-{int(month):02d}-{int(day):02d}"
-    except:
-        pass
+    # 一次正则匹配取出年月日，不再逐个格式尝试 strptime
+    match = _DATE_RE.match(date_str) or _COMPACT_RE.match(date_str)
+    if match:
+        year, month, day = int(match.group(1)), int(match.group(2)), int(match.group(3))
+        if month <= 12 and day <= 31:
+            return f"{year:04d}-{_MM[month]}-{_DD[day]}"
+    
+    # 如果都失败了,逐字符扫描出前三组数字作为年月日
+    parts = _fast_parse(date_str)
+    if parts is not None:
+        year, month, day = parts
+        # 补零
+        return f"{year:04d}-{month:02d}-{day:02d}"
     
     # 如果还是失败,返回原字符串
     return date_str
@@ -5,7 +5,9 @@
 """
 
 import os
+import re
 import sys
+import threading
 from pathlib import Path
 from typing import Optional, Dict, Any
 from loguru import logger
@@ -13,6 +15,16 @@ from loguru import logger
 
 # 全局日志配置状态
 _logger_configured = False
+_init_lock = threading.Lock()
+
+# 按模块名缓存 bind 后的 logger
+_BOUND_LOGGERS: Dict[str, Any] = {}
+
+# 敏感字段名匹配(不区分大小写,字段名包含任一关键字即视为敏感)
+_SENSITIVE_RE = re.compile(r'api_key|password|token|secret|authorization', re.IGNORECASE)
+
+# SQL 预览中的换行、制表符统一替换为空格
+_SQL_TRANS = str.maketrans({'\n': ' ', '\r': ' ', '\t': ' '})
 
 
 def setup_logger(
@@ -39,54 +51,59 @@ def setup_logger(
     """
     global _logger_configured
     
+    # 双重检查: 已配置时只做一次布尔判断; 并发初始化时由锁保证只添加一次 handler
     if _logger_configured:
         return
     
-    # 移除默认的 logger 配置
-    logger.remove()
-    
-    # 控制台日志格式
-    console_format = (
-        "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
-        "<level>{level: <8}</level> | "
-        "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> | "
-        "<level>{message}</level>"
-    )
-    
-    # 文件日志格式(更详细)
-    file_format = (
-        "{time:YYYY-MM-DD HH:mm:ss.SSS} | "
-        "{level: <8} | "
-        "{name}:{function}:{line} | "
-        "{message}"
-    )
-    
-    # 添加控制台输出
-    if enable_console:
+    with _init_lock:
+        if _logger_configured:
+            return
+        
+        # 移除默认的 logger 配置
+        logger.remove()
+        
+        # 控制台日志格式
+        console_format = (
+            "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
+            "<level>{level: <8}</level> | "
+            "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> | "
+            "<level>{message}</level>"
+        )
+        
+        # 文件日志格式(更详细)
+        file_format = (
+            "{time:YYYY-MM-DD HH:mm:ss.SSS} | "
+            "{level: <8} | "
+            "{name}:{function}:{line} | "
+            "{message}"
+        )
+        
+        # 添加控制台输出
+        if enable_console:
+            logger.add(
+                sys.stdout,
+                format=console_format,
+                level=log_level,
+                colorize=True
+            )
+        
+        # 确保日志目录存在
+        log_path = Path(log_file)
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # 添加文件输出(同步写入: enqueue=True 会让每条记录经 multiprocessing 队列 pickle 一次)
         logger.add(
-            sys.stdout,
-            format=console_format,
+            log_file,
+            format=file_format,
             level=log_level,
-            colorize=True
+            rotation=rotation,
+            retention=retention,
+            encoding='utf-8',
+            enqueue=False
         )
-    
-    # 确保日志目录存在
-    log_path = Path(log_file)
-    log_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    # 添加文件输出
-    logger.add(
-        log_file,
-        format=file_format,
-        level=log_level,
-        rotation=rotation,
-        retention=retention,
-        encoding='utf-8',
-        enqueue=True  # 异步写入
-    )
-    
-    _logger_configured = True
-    logger.info(f"日志系统已初始化 [级别: {log_level}, 文件: {log_file}]")
+        
+        _logger_configured = True
+        logger.info(f"日志系统已初始化 [级别: {log_level}, 文件: {log_file}]")
 
 
 def get_logger(name: Optional[str] = None):
@@ -109,8 +126,12 @@ def get_logger(name: Optional[str] = None):
         setup_logger()
     
     # loguru 的 logger 是全局单例,但可以通过 bind 添加上下文
+    # bind 每次都会创建新对象; 同名模块复用缓存的结果(它们共享同一个 core,配置变更仍然生效)
     if name:
-        return logger.bind(module=name)
+        bound = _BOUND_LOGGERS.get(name)
+        if bound is None:
+            bound = _BOUND_LOGGERS.setdefault(name, logger.bind(module=name))
+        return bound
     return logger
 
 
@@ -131,19 +152,18 @@ def log_sql_execution(
         row_count: 返回行数
         error: 错误信息(如果失败)
     """
-    log = get_logger("sql_executor")
-    
-    # 截断过长的 SQL(保留前200个字符)
-    sql_preview = sql[:200] + "..." if len(sql) > 200 else sql
-    sql_preview = sql_preview.replace('\n', ' ').strip()
+    log = get_logger("sql_executor").opt(lazy=True)
     
+    # 消息在 lambda 中生成，级别被过滤时不做 SQL 截断和字符串拼接
     if success:
         log.info(
-            f"SQL执行成功 | 耗时: {execution_time:.3f}s | 行数: {row_count} | SQL: {sql_preview}"
+            "{}",
+            lambda: f"SQL执行成功 | 耗时: {execution_time:.3f}s | 行数: {row_count} | SQL: {_trim_sql(sql)}"
         )
     else:
         log.error(
-            f"SQL执行失败 | 耗时: {execution_time:.3f}s | 错误: {error} | SQL: {sql_preview}"
+            "{}",
+            lambda: f"SQL执行失败 | 耗时: {execution_time:.3f}s | 错误: {error} | SQL: {_trim_sql(sql)}"
         )
 
 
@@ -166,23 +186,22 @@ def log_api_call(
         response_data: 响应数据(敏感信息会被脱敏)
         error: 错误信息(如果失败)
     """
-    log = get_logger("api_client")
-    
-    # 脱敏处理
-    safe_request = _sanitize_data(request_data) if request_data else {}
-    safe_response = _sanitize_data(response_data) if response_data else {}
+    log = get_logger("api_client").opt(lazy=True)
     
+    # 脱敏处理放在 lambda 中，DEBUG 级别关闭时不会执行
     if success:
         log.info(
-            f"API调用成功 | API: {api_name} | 耗时: {response_time:.3f}s"
+            "{}",
+            lambda: f"API调用成功 | API: {api_name} | 耗时: {response_time:.3f}s"
         )
-        log.debug(f"请求数据: {safe_request}")
-        log.debug(f"响应数据: {safe_response}")
+        log.debug("请求数据: {}", lambda: _sanitize_data(request_data) if request_data else {})
+        log.debug("响应数据: {}", lambda: _sanitize_data(response_data) if response_data else {})
     else:
         log.error(
-            f"API调用失败 | API: {api_name} | 耗时: {response_time:.3f}s | 错误: {error}"
+            "{}",
+            lambda: f"API调用失败 | API: {api_name} | 耗时: {response_time:.3f}s | 错误: {error}"
         )
-        log.debug(f"请求数据: {safe_request}")
+        log.debug("请求数据: {}", lambda: _sanitize_data(request_data) if request_data else {})
 
 
 def log_agent_iteration(
@@ -204,18 +223,29 @@ def log_agent_iteration(
     """
     log = get_logger("agent")
     
-    # 截断过长的内容
-    sql_preview = sql[:150] + "..." if len(sql) > 150 else sql
-    sql_preview = sql_preview.replace('\n', ' ').strip()
-    
     log.info(f"===== 迭代 {iteration} =====")
     log.info(f"用户问题: {user_question}")
-    log.info(f"生成SQL: {sql_preview}")
+    # 截断过长的 SQL，仅在该条日志实际输出时执行
+    log.opt(lazy=True).info("生成SQL: {}", lambda: _trim_sql(sql, 150))
     log.info(f"结果摘要: {result_summary}")
     log.info(f"下一步: {next_action}")
     log.info("=" * 50)
 
 
+def _trim_sql(sql: str, limit: int = 200) -> str:
+    """
+    生成单行的 SQL 预览
+    
+    参数:
+        sql: SQL 语句
+        limit: 保留的最大字符数,超出部分以 "..." 代替
+    
+    返回:
+        去掉换行的 SQL 预览
+    """
+    return (sql[:limit] + "..." if len(sql) > limit else sql).translate(_SQL_TRANS).strip()
+
+
 def _sanitize_data(data: Dict[str, Any]) -> Dict[str, Any]:
     """
     脱敏处理敏感数据
@@ -229,23 +259,34 @@ def _sanitize_data(data: Dict[str, Any]) -> Dict[str, Any]:
     if not isinstance(data, dict):
         return data
     
-    sensitive_keys = ['api_key', 'password', 'token', 'secret', 'authorization']
-    
+    # 用显式栈代替递归: 栈中每项为 (待处理的原字典, 写入结果的新字典)
     sanitized = {}
-    for key, value in data.items():
-        # 检查是否是敏感字段
-        if any(sk in key.lower() for sk in sensitive_keys):
-            # 保留前后各2个字符
-            if isinstance(value, str) and len(value) > 8:
-                sanitized[key] = f"{value[:2]}***{value[-2:]}"
+    stack = [(data, sanitized)]
+    while stack:
+        source, target = stack.pop()
+        for key, value in source.items():
+            # 检查是否是敏感字段
+            if _SENSITIVE_RE.search(key):
+                # 保留前后各2个字符
+                if isinstance(value, str) and len(value) > 8:
+                    target[key] = f"{value[:2]}***{value[-2:]}"
+                else:
+                    target[key] = "***"
+            elif isinstance(value, dict):
+                sub = target[key] = {}
+                stack.append((value, sub))
+            elif isinstance(value, list):
+                # 列表中只有字典元素需要脱敏,其余元素原样保留
+                items = target[key] = []
+                for item in value:
+                    if isinstance(item, dict):
+                        sub = {}
+                        items.append(sub)
+                        stack.append((item, sub))
+                    else:
+                        items.append(item)
             else:
-                sanitized[key] = "***"
-        elif isinstance(value, dict):
-            sanitized[key] = _sanitize_data(value)
-        elif isinstance(value, list):
-            sanitized[key] = [_sanitize_data(item) if isinstance(item, dict) else item for item in value]
-        else:
-            sanitized[key] = value
+                target[key] = value
     
     return sanitized
 
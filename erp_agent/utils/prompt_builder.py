@@ -9,9 +9,12 @@ Prompt 构建工具模块
 3. 占位符补全: 自动提取模板中的占位符并确保全部被正确填充
 """
 
-import re
+import functools
+import json
+import sys
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from string import Formatter
+from typing import AbstractSet, List, Dict, FrozenSet, Mapping, Optional, Any, Tuple
 
 # 导入泛化的时间工具（支持相对导入和绝对导入）
 try:
@@ -24,7 +27,8 @@ try:
         get_month_start_end,
         get_quarter_start_end,
         get_year_start_end,
-        format_date_for_sql
+        format_date_for_sql,
+        _parse_ymd
     )
 except ImportError:
     # 作为脚本直接运行时使用绝对导入
@@ -37,10 +41,344 @@ except ImportError:
         get_month_start_end,
         get_quarter_start_end,
         get_year_start_end,
-        format_date_for_sql
+        format_date_for_sql,
+        _parse_ymd
     )
 
 
+def _scan_placeholders(template: str) -> List[str]:
+    """
+    扫描模板中 {name} 形式的占位符（花括号内非空、不含 }）
+    
+    用 str.find 逐个定位花括号，结果与正则 \\{([^}]+)\\} 的 findall 相同。
+    """
+    names = []
+    find = template.find
+    i = 0
+    while True:
+        start = find('{', i)
+        if start < 0:
+            break
+        end = find('}', start + 1)
+        if end < 0:
+            break
+        if end == start + 1:
+            # 空的 {}，从下一个字符继续
+            i = start + 1
+            continue
+        names.append(template[start + 1:end])
+        i = end + 1
+    return names
+
+
+@functools.lru_cache(maxsize=32)
+def _placeholder_set(template: str) -> FrozenSet[str]:
+    """
+    模板占位符集合，按模板文本缓存
+    
+    同一模板被反复扫描时（如每次检查系统 Prompt 模板）直接返回缓存结果。
+    """
+    # 驻留名称字符串: 与代码中的同名字面量（已自动驻留）比较时只需比较指针
+    return frozenset(map(sys.intern, _scan_placeholders(template)))
+
+
+# 预编译后的模板片段: (字面文本, 占位符名称, 格式说明, 转换标记)
+_TemplateSegments = Tuple[Tuple[str, Optional[str], str, Optional[str]], ...]
+
+_CONVERTERS = {'s': str, 'r': repr, 'a': ascii}
+
+
+def _compile_template(template: str) -> _TemplateSegments:
+    """
+    将 str.format 风格的模板预先拆分为片段
+    
+    拆分规则与 str.format 相同（由 string.Formatter.parse 完成，
+    {{ 和 }} 转义为字面的花括号），之后每次渲染不再重新解析模板。
+    占位符只支持简单名称（可带格式说明和转换标记），不支持属性和下标访问。
+    名称经 sys.intern 驻留，渲染时按名称查字典可直接命中指针比较。
+    """
+    return tuple(
+        (literal, sys.intern(name) if name is not None else None, spec or '', conversion)
+        for literal, name, spec, conversion in Formatter().parse(template)
+    )
+
+
+def _render(segments: _TemplateSegments, values: Mapping[str, Any]) -> str:
+    """
+    用预编译的片段渲染模板，结果与 template.format_map(values) 相同
+    
+    values 可以是带 __missing__ 的惰性字典（如 _LazyValues），只有模板引用的占位符才会被取值；
+    缺少占位符对应的值时同样抛出 KeyError。
+    """
+    parts = []
+    append = parts.append
+    for literal, name, spec, conversion in segments:
+        append(literal)
+        if name is not None:
+            value = values[name]
+            if conversion:
+                value = _CONVERTERS[conversion](value)
+            append(format(value, spec))
+    return "".join(parts)
+
+
+def _file_mtime(path: Path, label: str) -> int:
+    """获取文件修改时间(纳秒),文件不存在时抛出 FileNotFoundError"""
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(f"{label} 文件不存在: {path}") from None
+
+
+def _read_text(path: Path) -> str:
+    """
+    以 UTF-8 读取整个文件
+    
+    直接解码字节内容，不经过文本模式的逐行缓冲；
+    换行符按文本模式的方式统一为 \\n。
+    """
+    text = path.read_bytes().decode('utf-8')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+# 各季度的 (起始月, 起始日, 结束月, 结束日)
+_QUARTER_BOUNDS = ((1, 1, 3, 31), (4, 1, 6, 30), (7, 1, 9, 30), (10, 1, 12, 31))
+
+
+def _partial_render(
+    segments: _TemplateSegments,
+    values: Mapping[str, Any],
+    deferred: AbstractSet[str]
+) -> _TemplateSegments:
+    """
+    预先代入部分占位符，返回只含剩余占位符的片段
+    
+    deferred 中的占位符保持不变，留到 _render 时再代入；
+    其余占位符从 values 取值（缺少时抛出 KeyError），格式化后并入相邻的字面文本。
+    """
+    compiled = []
+    pending = []
+    for literal, name, spec, conversion in segments:
+        pending.append(literal)
+        if name is None:
+            continue
+        if name not in deferred:
+            value = values[name]
+            if conversion:
+                value = _CONVERTERS[conversion](value)
+            pending.append(format(value, spec))
+        else:
+            compiled.append(("".join(pending), name, spec, conversion))
+            pending = []
+    compiled.append(("".join(pending), None, '', None))
+    return tuple(compiled)
+
+
+class _LazyValues(dict):
+    """
+    模板占位符取值字典
+    
+    显式给出的值直接存放；缺少的时间占位符在首次访问时
+    由 _PLACEHOLDER_COMPUTERS 计算并缓存，模板未引用的占位符不会被计算。
+    """
+    
+    def __init__(self, date_info: Dict[str, Any], **values: Any):
+        super().__init__(values)
+        self._date_info = date_info
+    
+    def __missing__(self, key: str) -> Any:
+        if key in _BASE_TIME_FIELDS:
+            value = self._date_info[key]
+        else:
+            compute = _PLACEHOLDER_COMPUTERS.get(key)
+            if compute is None:
+                raise KeyError(key)
+            value = compute(self._date_info)
+        self[key] = value
+        return value
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        # dict.get 不会调用 __missing__，这里同样按需计算，与 [] 访问保持一致
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+# 总是可用的基础时间占位符，直接取自 date_info
+_BASE_TIME_FIELDS = frozenset({'current_date', 'year', 'month'})
+
+# 每次请求都会变化的占位符，其余占位符（schema、examples、时间信息）在同一天内不变
+_PER_REQUEST_FIELDS = frozenset({'user_question', 'history_context', 'error_feedback', 'iteration_instruction'})
+
+# 首轮推理的迭代指令
+_FIRST_ITERATION_INSTRUCTION = "\n请开始第 1 轮推理，严格按照上述 JSON 格式输出。"
+
+# 时间占位符依赖的 date_info 字段（不含时分秒，同一天内不变）
+_DATE_KEY_FIELDS = ('current_date', 'year', 'month', 'day', 'weekday', 'weekday_cn')
+
+
+# 日期计算结果按参数缓存：同一进程内当前日期很少变化，重复构建 Prompt 时直接命中
+# 成对的起止日期也因此共用一次计算（如 current_year_start / current_year_end）
+@functools.lru_cache(maxsize=64)
+def _year_range(year: int):
+    return get_date_range_for_period(year)
+
+
+@functools.lru_cache(maxsize=64)
+def _month_range(date: str):
+    return get_month_start_end(date)
+
+
+@functools.lru_cache(maxsize=64)
+def _quarter_range(date: str):
+    return get_quarter_start_end(date)
+
+
+@functools.lru_cache(maxsize=64)
+def _date_offset(date: str, years: int = 0, months: int = 0) -> str:
+    return calculate_date_offset(date, years=years, months=months)
+
+
+def _previous_month(month: int) -> int:
+    return month - 1 if month > 1 else 12
+
+
+# 输出格式说明中不随轮次变化的部分
+_OUTPUT_FORMAT_HEADER = "## 输出要求\n\n"
+_OUTPUT_FORMAT_FOOTER = (
+    "```json\n"
+    "{\n"
+    '  "thought": "你的思考过程，分析当前情况和策略",\n'
+    '  "action": "execute_sql 或 answer",\n'
+    '  "sql": "如果 action 是 execute_sql，这里填写 SQL 语句",\n'
+    '  "answer": "如果 action 是 answer，这里填写最终答案",\n'
+    '  "is_final": false 或 true\n'
+    "}\n"
+    "```\n\n"
+    "**重要说明**:\n"
+    "- 如果还需要查询数据，使用 `action: execute_sql` 并提供 SQL\n"
+    "- 如果已经可以回答问题，使用 `action: answer` 并提供答案，同时设置 `is_final: true`\n"
+    "- `thought` 字段必须包含你的推理过程\n"
+    "- SQL 必须是可以直接执行的完整语句，以分号结尾\n"
+    "- 只输出 JSON，不要有其他文字\n"
+)
+
+# format_date_context 展示的时间占位符
+_CONTEXT_FIELDS = frozenset({
+    'weekday_cn', 'year_minus_1', 'year_minus_2',
+    'last_year_start', 'last_year_end',
+    'year_minus_2_start', 'year_minus_2_end',
+    'one_year_ago', 'six_months_ago', 'three_months_ago',
+    'current_year_start', 'current_year_end',
+    'current_month_start', 'current_month_end',
+    'current_quarter_start', 'current_quarter_end'
+})
+
+# suggest_time_expression_for_query 识别的时间关键词（按匹配优先级排列）
+# 关键词 -> 计算 ((开始日期, 结束日期), 描述) 的函数，只在关键词命中后调用
+_KEYWORD_HANDLERS = {
+    '今年': lambda d: (_year_range(d['year']), f"今年 ({d['year']}年)"),
+    '去年': lambda d: (_year_range(d['year'] - 1), f"去年 ({d['year'] - 1}年)"),
+    '前年': lambda d: (_year_range(d['year'] - 2), f"前年 ({d['year'] - 2}年)"),
+    '本月': lambda d: (_month_range(d['current_date']), f"本月 ({d['year']}年{d['month']}月)"),
+    '上月': lambda d: (_month_range(_date_offset(d['current_date'], months=-1)), '上月'),
+    '本季度': lambda d: (_quarter_range(d['current_date']), '本季度'),
+    '最近一年': lambda d: ((_date_offset(d['current_date'], years=-1), d['current_date']), '最近一年'),
+    '最近半年': lambda d: ((_date_offset(d['current_date'], months=-6), d['current_date']), '最近半年'),
+    '最近三个月': lambda d: ((_date_offset(d['current_date'], months=-3), d['current_date']), '最近三个月'),
+}
+
+# 时间占位符 -> 计算函数（参数为 get_current_datetime() 返回的时间信息）
+_PLACEHOLDER_COMPUTERS = {
+    # 基础时间信息
+    'month_padded': lambda d: f"{d['month']:02d}",
+    'day': lambda d: d.get('day', 1),
+    'weekday': lambda d: d.get('weekday', ''),
+    'weekday_cn': lambda d: d.get('weekday_cn', ''),
+    # 相对年份
+    'year_minus_1': lambda d: d['year'] - 1,
+    'year_minus_2': lambda d: d['year'] - 2,
+    # 相对月份
+    'month_minus_1': lambda d: _previous_month(d['month']),
+    'month_minus_1_padded': lambda d: f"{_previous_month(d['month']):02d}",
+    # 相对时间点
+    'three_months_ago': lambda d: _date_offset(d['current_date'], months=-3),
+    'six_months_ago': lambda d: _date_offset(d['current_date'], months=-6),
+    'one_year_ago': lambda d: _date_offset(d['current_date'], years=-1),
+    # 年份范围
+    'current_year_start': lambda d: _year_range(d['year'])[0],
+    'current_year_end': lambda d: _year_range(d['year'])[1],
+    'last_year_start': lambda d: _year_range(d['year'] - 1)[0],
+    'last_year_end': lambda d: _year_range(d['year'] - 1)[1],
+    'year_minus_2_start': lambda d: _year_range(d['year'] - 2)[0],
+    'year_minus_2_end': lambda d: _year_range(d['year'] - 2)[1],
+    # 月份范围
+    'current_month_start': lambda d: _month_range(d['current_date'])[0],
+    'current_month_end': lambda d: _month_range(d['current_date'])[1],
+    # 季度范围
+    'current_quarter_start': lambda d: _quarter_range(d['current_date'])[0],
+    'current_quarter_end': lambda d: _quarter_range(d['current_date'])[1],
+}
+
+
+def _format_history_result(item: Dict[str, Any]) -> str:
+    """
+    格式化一轮历史记录的执行结果部分
+    
+    参数:
+        item: 历史记录项（包含 result，失败时可能带有 validation_feedback / error_analysis）
+    
+    返回:
+        str: 执行结果文本
+    """
+    result = item['result']
+    if result.get('success'):
+        row_count = result.get('row_count', 0)
+        text = f"**执行结果**: 成功,返回 {row_count} 行\n"
+        
+        # 显示数据（根据数据量决定显示多少行）
+        if result.get('data'):
+            data = result['data']
+            # 动态决定显示多少行：
+            # - 50行以内：全部显示（提高数据完整性）
+            # - 50行以上：显示前30行和后10行，中间省略
+            if row_count <= 50:
+                # 全部显示
+                text += f"```json\n{json.dumps(data, ensure_ascii=False, default=str, indent=2)}\n```\n\n"
+            else:
+                # 显示前30行和后10行
+                sample_data = data[:30] + ['...省略中间数据...'] + data[-10:]
+                text += (
+                    f"```json\n{json.dumps(sample_data, ensure_ascii=False, default=str, indent=2)}\n```\n"
+                    f"（共 {row_count} 行，上面显示了前30行和后10行）\n\n"
+                )
+        return text
+    
+    error = result.get('error', '未知错误')
+    parts = [f"**执行结果**: 失败\n**错误信息**: {error}\n"]
+    
+    # 【关键改进】如果有验证反馈，优先显示
+    if 'validation_feedback' in item:
+        parts.append(f"\n**验证反馈**:\n{item['validation_feedback']}\n")
+    
+    # 【架构优化】如果有智能错误分析，添加诊断信息
+    if 'error_analysis' in item:
+        analysis = item['error_analysis']
+        parts.append(
+            f"**错误诊断**: {analysis.get('diagnosis', '')}\n"
+            f"**根本原因**: {analysis.get('root_cause', '')}\n"
+            f"**修复策略**: {analysis.get('fix_strategy', '')}\n"
+        )
+        if 'example' in analysis:
+            parts.append(f"\n**正确示例**:\n{analysis['example']}\n")
+    
+    parts.append("\n")
+    return "".join(parts)
+
+
 class PromptBuilder:
     """
     Prompt 构建器
@@ -75,10 +413,19 @@ class PromptBuilder:
         if not self.prompts_dir.exists():
             raise FileNotFoundError(f"Prompts 文件夹不存在: {self.prompts_dir}")
         
-        # 延迟加载,只在需要时加载文件
+        # 延迟加载,只在需要时加载文件; 同时记录文件的修改时间,文件变化后重新加载
         self._schema = None
         self._examples = None
         self._system_prompt_template = None
+        self._schema_mtime = None
+        self._examples_mtime = None
+        self._system_prompt_template_mtime = None
+        # 模板中的占位符集合,随模板一起加载(模板加载后不再变化)
+        self._template_placeholders: Optional[FrozenSet[str]] = None
+        # 预编译的模板片段,随模板一起加载
+        self._template_segments: Optional[_TemplateSegments] = None
+        # 已代入 schema、examples 和时间占位符的模板片段: (缓存键, 片段)
+        self._stage2: Optional[Tuple[tuple, _TemplateSegments]] = None
     
     def load_schema(self) -> str:
         """
@@ -87,13 +434,13 @@ class PromptBuilder:
         返回:
             str: Schema 文本内容
         """
-        if self._schema is None:
-            schema_file = self.prompts_dir / 'schema.txt'
-            if not schema_file.exists():
-                raise FileNotFoundError(f"Schema 文件不存在: {schema_file}")
-            
-            with open(schema_file, 'r', encoding='utf-8') as f:
-                self._schema = f.read()
+        schema_file = self.prompts_dir / 'schema.txt'
+        mtime = _file_mtime(schema_file, "Schema")
+        
+        # 文件修改后重新读取，未修改时只需一次 stat
+        if self._schema is None or self._schema_mtime != mtime:
+            self._schema = _read_text(schema_file)
+            self._schema_mtime = mtime
         
         return self._schema
     
@@ -104,13 +451,13 @@ class PromptBuilder:
         返回:
             str: 示例文本内容
         """
-        if self._examples is None:
-            examples_file = self.prompts_dir / 'examples.txt'
-            if not examples_file.exists():
-                raise FileNotFoundError(f"Examples 文件不存在: {examples_file}")
-            
-            with open(examples_file, 'r', encoding='utf-8') as f:
-                self._examples = f.read()
+        examples_file = self.prompts_dir / 'examples.txt'
+        mtime = _file_mtime(examples_file, "Examples")
+        
+        # 文件修改后重新读取，未修改时只需一次 stat
+        if self._examples is None or self._examples_mtime != mtime:
+            self._examples = _read_text(examples_file)
+            self._examples_mtime = mtime
         
         return self._examples
     
@@ -121,16 +468,28 @@ class PromptBuilder:
         返回:
             str: 系统 Prompt 模板文本
         """
-        if self._system_prompt_template is None:
-            system_prompt_file = self.prompts_dir / 'system_prompt.txt'
-            if not system_prompt_file.exists():
-                raise FileNotFoundError(f"System prompt 文件不存在: {system_prompt_file}")
-            
-            with open(system_prompt_file, 'r', encoding='utf-8') as f:
-                self._system_prompt_template = f.read()
+        system_prompt_file = self.prompts_dir / 'system_prompt.txt'
+        mtime = _file_mtime(system_prompt_file, "System prompt")
+        
+        # 文件修改后重新读取，未修改时只需一次 stat
+        if self._system_prompt_template is None or self._system_prompt_template_mtime != mtime:
+            self._system_prompt_template = _read_text(system_prompt_file)
+            self._system_prompt_template_mtime = mtime
+            self._template_placeholders = _placeholder_set(self._system_prompt_template)
+            self._template_segments = _compile_template(self._system_prompt_template)
         
         return self._system_prompt_template
     
+    def get_template_placeholders(self) -> FrozenSet[str]:
+        """
+        获取系统 Prompt 模板中的占位符集合
+        
+        返回:
+            frozenset: 占位符集合，随模板一起缓存，模板文件修改后重新计算
+        """
+        self.load_system_prompt_template()
+        return self._template_placeholders
+    
     def build_sql_generation_prompt(
         self,
         user_question: str,
@@ -155,98 +514,92 @@ class PromptBuilder:
             date_info = get_current_datetime()
         
         # 加载模板和内容
-        template = self.load_system_prompt_template()
+        self.load_system_prompt_template()
         schema = self.load_schema()
         # 始终加载所有 few-shot 示例（不进行选择）
         examples = self.load_examples()
         
-        # 构建历史上下文文本
+        # 首轮（无历史记录、无错误反馈）最常见，直接使用固定的取值
+        if not context and not error_feedback:
+            return _render(self._get_stage2(date_info, schema, examples), {
+                'history_context': "",
+                'error_feedback': "",
+                'user_question': user_question,
+                'iteration_instruction': _FIRST_ITERATION_INSTRUCTION,
+            })
+        
+        # 构建历史上下文文本（先收集片段，最后一次拼接）
         history_context = ""
         if context and len(context) > 0:
-            history_context = "\n## 历史执行记录\n\n"
-            history_context += "你已经执行过以下查询:\n\n"
+            parts = ["\n## 历史执行记录\n\n", "你已经执行过以下查询:\n\n"]
+            append = parts.append
             
+            # 每轮拼成一个字符串后追加；字段缺失时对应段落为空
             for idx, item in enumerate(context, 1):
-                history_context += f"### 第 {idx} 轮\n\n"
-                
-                if 'thought' in item:
-                    history_context += f"**思考**: {item['thought']}\n\n"
-                
-                if 'sql' in item:
-                    history_context += f"**SQL**: \n```sql\n{item['sql']}\n```\n\n"
-                
-                if 'result' in item:
-                    result = item['result']
-                    if result.get('success'):
-                        row_count = result.get('row_count', 0)
-                        history_context += f"**执行结果**: 成功,返回 {row_count} 行\n"
-                        
-                        # 显示数据（根据数据量决定显示多少行）
-                        if result.get('data'):
-                            data = result['data']
-                            # 动态决定显示多少行：
-                            # - 50行以内：全部显示（提高数据完整性）
-                            # - 50行以上：显示前30行和后10行，中间省略
-                            if row_count <= 50:
-                                # 全部显示
-                                import json
-                                history_context += f"```json\n{json.dumps(data, ensure_ascii=False, default=str, indent=2)}\n```\n\n"
-                            else:
-                                # 显示前30行和后10行
-                                import json
-                                sample_data = data[:30] + ['...省略中间数据...'] + data[-10:]
-                                history_context += f"```json\n{json.dumps(sample_data, ensure_ascii=False, default=str, indent=2)}\n```\n"
-                                history_context += f"（共 {row_count} 行，上面显示了前30行和后10行）\n\n"
-                    else:
-                        error = result.get('error', '未知错误')
-                        history_context += f"**执行结果**: 失败\n**错误信息**: {error}\n"
-                        
-                        # 【关键改进】如果有验证反馈，优先显示
-                        if 'validation_feedback' in item:
-                            history_context += f"\n**验证反馈**:\n{item['validation_feedback']}\n"
-                        
-                        # 【架构优化】如果有智能错误分析，添加诊断信息
-                        if 'error_analysis' in item:
-                            analysis = item['error_analysis']
-                            history_context += f"**错误诊断**: {analysis.get('diagnosis', '')}\n"
-                            history_context += f"**根本原因**: {analysis.get('root_cause', '')}\n"
-                            history_context += f"**修复策略**: {analysis.get('fix_strategy', '')}\n"
-                            if 'example' in analysis:
-                                history_context += f"\n**正确示例**:\n{analysis['example']}\n"
-                        
-                        history_context += "\n"
+                thought_text = f"**思考**: {item['thought']}\n\n" if 'thought' in item else ""
+                sql_text = f"**SQL**: \n```sql\n{item['sql']}\n```\n\n" if 'sql' in item else ""
+                result_text = _format_history_result(item) if 'result' in item else ""
+                append(f"### 第 {idx} 轮\n\n{thought_text}{sql_text}{result_text}")
+            
+            history_context = "".join(parts)
         
         # 构建错误反馈文本
         error_feedback_text = ""
         if error_feedback:
-            error_feedback_text = "\n## ⚠️ 错误反馈\n\n"
-            error_feedback_text += "上一次查询执行失败，请根据错误信息修正 SQL：\n\n"
-            error_feedback_text += f"```\n{error_feedback}\n```\n\n"
-            error_feedback_text += "请分析错误原因，重新生成正确的 SQL 查询。\n"
+            error_feedback_text = "".join((
+                "\n## ⚠️ 错误反馈\n\n",
+                "上一次查询执行失败，请根据错误信息修正 SQL：\n\n",
+                f"```\n{error_feedback}\n```\n\n",
+                "请分析错误原因，重新生成正确的 SQL 查询。\n",
+            ))
         
         # 构建迭代指令
         iteration = len(context) + 1 if context else 1
         iteration_instruction = f"\n请开始第 {iteration} 轮推理，严格按照上述 JSON 格式输出。"
         
-        # 提取模板中实际使用的占位符
-        template_placeholders = self.extract_placeholders(template)
-        
-        # 按需计算时间占位符（只计算模板中实际使用的）
-        time_placeholders = self._calculate_time_placeholders(date_info, template_placeholders)
-        
-        # 替换模板中的所有占位符
-        prompt = template.format(
-            schema=schema,
-            examples=examples,
-            history_context=history_context,
-            error_feedback=error_feedback_text,
-            user_question=user_question,
-            iteration_instruction=iteration_instruction,
-            **time_placeholders  # 解包所有时间占位符
-        )
+        # 模板的静态部分已预先代入，这里只替换随请求变化的占位符
+        prompt = _render(self._get_stage2(date_info, schema, examples), {
+            'history_context': history_context,
+            'error_feedback': error_feedback_text,
+            'user_question': user_question,
+            'iteration_instruction': iteration_instruction,
+        })
         
         return prompt
     
+    def _get_stage2(
+        self,
+        date_info: Dict[str, Any],
+        schema: str,
+        examples: str
+    ) -> _TemplateSegments:
+        """
+        获取已代入静态内容的模板片段
+        
+        schema、examples 和时间占位符在同一天内不会变化，预先代入模板，
+        按 (模板, schema, examples, 日期) 缓存最近一次的结果。
+        
+        参数:
+            date_info: 时间信息字典
+            schema: 数据库 Schema 说明
+            examples: Few-shot 示例
+        
+        返回:
+            只包含随请求变化的占位符的模板片段
+        """
+        key = (
+            self._template_segments, schema, examples,
+            tuple(date_info.get(field) for field in _DATE_KEY_FIELDS)
+        )
+        if self._stage2 is not None and self._stage2[0] == key:
+            return self._stage2[1]
+        
+        # 时间占位符在代入时按需计算（只计算模板中实际使用的）
+        static_values = _LazyValues(date_info, schema=schema, examples=examples)
+        segments = _partial_render(self._template_segments, static_values, _PER_REQUEST_FIELDS)
+        self._stage2 = (key, segments)
+        return segments
+    
     def build_answer_generation_prompt(
         self,
         user_question: str,
@@ -262,140 +615,74 @@ class PromptBuilder:
         返回:
             str: 答案生成的 Prompt
         """
-        prompt = "# 数据分析助手\n\n"
-        prompt += "你是一个数据分析助手。根据 SQL 查询结果回答用户问题。\n\n"
-        
-        prompt += f"## 用户问题\n\n{user_question}\n\n"
-        
-        prompt += "## 查询过程\n\n"
+        parts = [
+            "# 数据分析助手\n\n",
+            "你是一个数据分析助手。根据 SQL 查询结果回答用户问题。\n\n",
+            f"## 用户问题\n\n{user_question}\n\n",
+            "## 查询过程\n\n",
+        ]
+        append = parts.append
         
         for idx, item in enumerate(sql_history, 1):
-            prompt += f"### 第 {idx} 次查询\n\n"
+            append(f"### 第 {idx} 次查询\n\n")
             
             if 'sql' in item:
-                prompt += f"**SQL**:\n```sql\n{item['sql']}\n```\n\n"
+                append(f"**SQL**:\n```sql\n{item['sql']}\n```\n\n")
             
             if 'result' in item:
                 result = item['result']
                 if result.get('success'):
-                    prompt += f"**结果**: {result.get('data')}\n\n"
+                    append(f"**结果**: {result.get('data')}\n\n")
                 else:
-                    prompt += f"**错误**: {result.get('error')}\n\n"
-        
-        prompt += "## 回答要求\n\n"
-        prompt += "1. 用清晰、友好的中文回答问题\n"
-        prompt += "2. 包含具体的数字和统计结果\n"
-        prompt += "3. 如果合适，提供简单的洞察或解释\n"
-        prompt += "4. 答案简洁明了，避免技术术语\n"
-        prompt += "5. 如果数据显示异常或有特殊情况，请指出\n\n"
-        
-        prompt += "请基于以上查询结果回答用户的问题:\n"
+                    append(f"**错误**: {result.get('error')}\n\n")
+        
+        parts.append(
+            "## 回答要求\n\n"
+            "1. 用清晰、友好的中文回答问题\n"
+            "2. 包含具体的数字和统计结果\n"
+            "3. 如果合适，提供简单的洞察或解释\n"
+            "4. 答案简洁明了，避免技术术语\n"
+            "5. 如果数据显示异常或有特殊情况，请指出\n\n"
+            "请基于以上查询结果回答用户的问题:\n"
+        )
         
-        return prompt
+        return "".join(parts)
     
     def _calculate_time_placeholders(
         self, 
         date_info: Dict[str, Any],
-        required_placeholders: Optional[List[str]] = None
+        required_placeholders: Optional[AbstractSet[str]] = None,
+        template_only: bool = False
     ) -> Dict[str, Any]:
         """
         按需计算时间相关的占位符
         
         参数:
             date_info: 来自 get_current_datetime() 的时间信息
-            required_placeholders: 需要计算的占位符列表，如果为 None 则计算所有
+            required_placeholders: 需要计算的占位符集合，如果为 None 则计算所有
+            template_only: 为 True 时忽略 required_placeholders，只计算系统 Prompt 模板中出现的占位符
         
         返回:
             dict: 包含请求的时间占位符的字典
         """
-        # 提取基础信息（总是需要）
-        current_date = date_info['current_date']
-        year = date_info['year']
-        month = date_info['month']
-        
-        # 初始化结果字典，包含基础信息
+        # 基础信息（总是需要）
         placeholders = {
-            'current_date': current_date,
-            'year': year,
-            'month': month,
+            'current_date': date_info['current_date'],
+            'year': date_info['year'],
+            'month': date_info['month'],
         }
         
-        # 如果没有指定需要的占位符，则计算所有可能的占位符
-        if required_placeholders is None:
-            required_placeholders = []
-        
-        # 按需计算各类占位符
-        time_related_fields = set(required_placeholders) if required_placeholders else set()
-        
-        # 基础时间信息
-        if not required_placeholders or 'month_padded' in time_related_fields:
-            placeholders['month_padded'] = f"{month:02d}"
-        
-        if not required_placeholders or 'day' in time_related_fields:
-            placeholders['day'] = date_info.get('day', 1)
-        
-        if not required_placeholders or 'weekday' in time_related_fields:
-            placeholders['weekday'] = date_info.get('weekday', '')
-        
-        if not required_placeholders or 'weekday_cn' in time_related_fields:
-            placeholders['weekday_cn'] = date_info.get('weekday_cn', '')
-        
-        # 相对年份
-        if not required_placeholders or 'year_minus_1' in time_related_fields:
-            placeholders['year_minus_1'] = year - 1
-        
-        if not required_placeholders or 'year_minus_2' in time_related_fields:
-            placeholders['year_minus_2'] = year - 2
-        
-        # 相对月份
-        if not required_placeholders or 'month_minus_1' in time_related_fields:
-            placeholders['month_minus_1'] = month - 1 if month > 1 else 12
-        
-        if not required_placeholders or 'month_minus_1_padded' in time_related_fields:
-            month_minus_1 = month - 1 if month > 1 else 12
-            placeholders['month_minus_1_padded'] = f"{month_minus_1:02d}"
+        # 只计算系统 Prompt 模板中出现的占位符（随模板缓存）；
+        # 否则没有指定需要的占位符时计算所有，指定时只计算需要的
+        if template_only:
+            names = _PLACEHOLDER_COMPUTERS.keys() & self.get_template_placeholders()
+        elif required_placeholders:
+            names = _PLACEHOLDER_COMPUTERS.keys() & required_placeholders
+        else:
+            names = _PLACEHOLDER_COMPUTERS.keys()
         
-        # 相对时间点
-        if not required_placeholders or 'three_months_ago' in time_related_fields:
-            placeholders['three_months_ago'] = calculate_date_offset(current_date, months=-3)
-        
-        if not required_placeholders or 'six_months_ago' in time_related_fields:
-            placeholders['six_months_ago'] = calculate_date_offset(current_date, months=-6)
-        
-        if not required_placeholders or 'one_year_ago' in time_related_fields:
-            placeholders['one_year_ago'] = calculate_date_offset(current_date, years=-1)
-        
-        # 年份范围
-        if not required_placeholders or 'current_year_start' in time_related_fields or 'current_year_end' in time_related_fields:
-            current_year_start, current_year_end = get_date_range_for_period(year)
-            if not required_placeholders or 'current_year_start' in time_related_fields:
-                placeholders['current_year_start'] = current_year_start
-            if not required_placeholders or 'current_year_end' in time_related_fields:
-                placeholders['current_year_end'] = current_year_end
-        
-        if not required_placeholders or 'last_year_start' in time_related_fields or 'last_year_end' in time_related_fields:
-            year_minus_1 = year - 1
-            last_year_start, last_year_end = get_date_range_for_period(year_minus_1)
-            if not required_placeholders or 'last_year_start' in time_related_fields:
-                placeholders['last_year_start'] = last_year_start
-            if not required_placeholders or 'last_year_end' in time_related_fields:
-                placeholders['last_year_end'] = last_year_end
-        
-        # 月份范围
-        if not required_placeholders or 'current_month_start' in time_related_fields or 'current_month_end' in time_related_fields:
-            current_month_start, current_month_end = get_month_start_end(current_date)
-            if not required_placeholders or 'current_month_start' in time_related_fields:
-                placeholders['current_month_start'] = current_month_start
-            if not required_placeholders or 'current_month_end' in time_related_fields:
-                placeholders['current_month_end'] = current_month_end
-        
-        # 季度范围
-        if not required_placeholders or 'current_quarter_start' in time_related_fields or 'current_quarter_end' in time_related_fields:
-            current_quarter_start, current_quarter_end = get_quarter_start_end(current_date)
-            if not required_placeholders or 'current_quarter_start' in time_related_fields:
-                placeholders['current_quarter_start'] = current_quarter_start
-            if not required_placeholders or 'current_quarter_end' in time_related_fields:
-                placeholders['current_quarter_end'] = current_quarter_end
+        for name in names:
+            placeholders[name] = _PLACEHOLDER_COMPUTERS[name](date_info)
         
         return placeholders
     
@@ -434,15 +721,7 @@ class PromptBuilder:
             date_info = get_current_datetime()
         
         # 计算所有需要显示的时间占位符
-        required_fields = [
-            'weekday_cn', 'year_minus_1', 'year_minus_2',
-            'last_year_start', 'last_year_end',
-            'one_year_ago', 'six_months_ago', 'three_months_ago',
-            'current_year_start', 'current_year_end',
-            'current_month_start', 'current_month_end',
-            'current_quarter_start', 'current_quarter_end'
-        ]
-        time_data = self._calculate_time_placeholders(date_info, required_fields)
+        time_data = self._calculate_time_placeholders(date_info, _CONTEXT_FIELDS)
         
         lines = ["========== 时间上下文 =========="]
         
@@ -455,9 +734,7 @@ class PromptBuilder:
         # 相对年份
         lines.append("相对年份:")
         lines.append(f"- 去年: {time_data.get('year_minus_1')}年 ({time_data.get('last_year_start')} 至 {time_data.get('last_year_end')})")
-        # 获取前年的日期范围
-        year_minus_2_start, year_minus_2_end = get_date_range_for_period(time_data.get('year_minus_2'))
-        lines.append(f"- 前年: {time_data.get('year_minus_2')}年 ({year_minus_2_start} 至 {year_minus_2_end})")
+        lines.append(f"- 前年: {time_data.get('year_minus_2')}年 ({time_data.get('year_minus_2_start')} 至 {time_data.get('year_minus_2_end')})")
         lines.append("")
         
         # 相对时间点
@@ -475,38 +752,17 @@ class PromptBuilder:
         
         return "\n".join(lines)
     
-    def _get_output_format_instruction(self, context: Optional[List[Dict[str, Any]]] = None) -> str:
+    def _get_output_format_instruction(self, iteration: int = 1) -> str:
         """
         获取输出格式说明
         
         参数:
-            context: 历史上下文
+            iteration: 当前推理轮次（与 build_sql_generation_prompt 中的轮次一致）
         
         返回:
             str: 输出格式说明文本
         """
-        iteration = len(context) + 1 if context else 1
-        
-        instruction = "## 输出要求\n\n"
-        instruction += f"这是第 {iteration} 轮推理。请按照以下 JSON 格式输出:\n\n"
-        instruction += "```json\n"
-        instruction += "{\n"
-        instruction += '  "thought": "你的思考过程，分析当前情况和策略",\n'
-        instruction += '  "action": "execute_sql 或 answer",\n'
-        instruction += '  "sql": "如果 action 是 execute_sql，这里填写 SQL 语句",\n'
-        instruction += '  "answer": "如果 action 是 answer，这里填写最终答案",\n'
-        instruction += '  "is_final": false 或 true\n'
-        instruction += "}\n"
-        instruction += "```\n\n"
-        
-        instruction += "**重要说明**:\n"
-        instruction += "- 如果还需要查询数据，使用 `action: execute_sql` 并提供 SQL\n"
-        instruction += "- 如果已经可以回答问题，使用 `action: answer` 并提供答案，同时设置 `is_final: true`\n"
-        instruction += "- `thought` 字段必须包含你的推理过程\n"
-        instruction += "- SQL 必须是可以直接执行的完整语句，以分号结尾\n"
-        instruction += "- 只输出 JSON，不要有其他文字\n"
-        
-        return instruction
+        return f"{_OUTPUT_FORMAT_HEADER}这是第 {iteration} 轮推理。请按照以下 JSON 格式输出:\n\n{_OUTPUT_FORMAT_FOOTER}"
     
     def get_time_range_description(
         self,
@@ -533,37 +789,35 @@ class PromptBuilder:
         if date_info is None:
             date_info = get_current_datetime()
         
-        from datetime import datetime
-        
-        start = datetime.strptime(start_date, '%Y-%m-%d')
-        end = datetime.strptime(end_date, '%Y-%m-%d')
+        # 直接解析为整数年月日，不经过 strptime
+        start_year, start_month, start_day = _parse_ymd(start_date)
+        end_year, end_month, end_day = _parse_ymd(end_date)
         
         # 检查是否是整年
-        if start.month == 1 and start.day == 1 and end.month == 12 and end.day == 31:
-            if start.year == end.year:
+        if start_month == 1 and start_day == 1 and end_month == 12 and end_day == 31:
+            if start_year == end_year:
                 current_year = date_info['year']
-                if start.year == current_year:
+                if start_year == current_year:
                     return "今年"
-                elif start.year == current_year - 1:
+                elif start_year == current_year - 1:
                     return "去年"
-                elif start.year == current_year - 2:
+                elif start_year == current_year - 2:
                     return "前年"
                 else:
-                    return f"{start.year}年"
+                    return f"{start_year}年"
         
         # 检查是否是整月
-        if start.day == 1:
-            expected_end = get_month_start_end(start_date)[1]
+        if start_day == 1:
+            expected_end = _month_range(start_date)[1]
             if end_date == expected_end:
-                return f"{start.year}年{start.month}月"
+                return f"{start_year}年{start_month}月"
         
-        # 检查是否是季度
-        quarter_starts = {1: (1, 1), 2: (4, 1), 3: (7, 1), 4: (10, 1)}
-        quarter_ends = {1: (3, 31), 2: (6, 30), 3: (9, 30), 4: (12, 31)}
-        for q, (sm, sd) in quarter_starts.items():
-            em, ed = quarter_ends[q]
-            if start.month == sm and start.day == sd and end.month == em and end.day == ed:
-                return f"{start.year}年第{q}季度"
+        # 检查是否是季度（开始月份直接决定所在季度）
+        if start_day == 1 and start_month in (1, 4, 7, 10):
+            q = (start_month - 1) // 3
+            _, _, em, ed = _QUARTER_BOUNDS[q]
+            if end_month == em and end_day == ed:
+                return f"{start_year}年第{q + 1}季度"
         
         # 默认返回日期范围
         return f"{start_date} 至 {end_date}"
@@ -601,24 +855,10 @@ class PromptBuilder:
             'description': ''
         }
         
-        current_date = date_info['current_date']
-        year = date_info['year']
-        
-        # 检测时间关键词
-        time_keywords = {
-            '今年': (get_date_range_for_period(year), f'今年 ({year}年)'),
-            '去年': (get_date_range_for_period(year - 1), f'去年 ({year-1}年)'),
-            '前年': (get_date_range_for_period(year - 2), f'前年 ({year-2}年)'),
-            '本月': (get_month_start_end(current_date), f'本月 ({year}年{date_info["month"]}月)'),
-            '上月': (get_month_start_end(calculate_date_offset(current_date, months=-1)), '上月'),
-            '本季度': (get_quarter_start_end(current_date), '本季度'),
-            '最近一年': ((calculate_date_offset(current_date, years=-1), current_date), '最近一年'),
-            '最近半年': ((calculate_date_offset(current_date, months=-6), current_date), '最近半年'),
-            '最近三个月': ((calculate_date_offset(current_date, months=-3), current_date), '最近三个月'),
-        }
-        
-        for keyword, (date_range, desc) in time_keywords.items():
+        # 先做子串匹配，只为命中的第一个关键词计算日期范围
+        for keyword, handler in _KEYWORD_HANDLERS.items():
             if keyword in user_question:
+                date_range, desc = handler(date_info)
                 result['has_time'] = True
                 result['keywords'].append(keyword)
                 result['suggested_range'] = date_range
@@ -640,6 +880,17 @@ class PromptBuilder:
         """
         return self.load_examples()
     
+    def invalidate_examples_cache(self) -> None:
+        """
+        清除已缓存的 Few-shot 示例，下次获取时重新读取文件
+        
+        说明:
+            示例文件修改后会按修改时间自动重新读取；
+            修改时间精度不足以区分的连续写入（如测试中）可调用此方法强制重新读取。
+        """
+        self._examples = None
+        self._examples_mtime = None
+    
     def extract_placeholders(self, template: str) -> List[str]:
         """
         提取模板中的占位符
@@ -653,9 +904,7 @@ class PromptBuilder:
         示例:
             "{current_date} 和 {current_year}" -> ['current_date', 'current_year']
         """
-        pattern = r'\{([^}]+)\}'
-        matches = re.findall(pattern, template)
-        return matches
+        return _scan_placeholders(template)
     
     def validate_template(self, template: str, required_fields: List[str]) -> bool:
         """
@@ -668,8 +917,15 @@ class PromptBuilder:
         返回:
             bool: 是否包含所有必需字段
         """
-        placeholders = self.extract_placeholders(template)
-        return all(field in placeholders for field in required_fields)
+        # 用缓存的占位符集合判断包含关系（在 C 层完成遍历）
+        return _placeholder_set(template).issuperset(required_fields)
+
+
+# 消息字典的键和角色名（驻留后所有消息共享同一组字符串对象）
+_KEY_ROLE = sys.intern("role")
+_KEY_CONTENT = sys.intern("content")
+_ROLE_USER = sys.intern("user")
+_ROLE_SYSTEM = sys.intern("system")
 
 
 def create_user_message(user_question: str) -> Dict[str, str]:
@@ -682,10 +938,7 @@ def create_user_message(user_question: str) -> Dict[str, str]:
     返回:
         dict: 消息对象，包含 role 和 content
     """
-    return {
-        "role": "user",
-        "content": user_question
-    }
+    return {_KEY_ROLE: _ROLE_USER, _KEY_CONTENT: user_question}
 
 
 def create_system_message(content: str) -> Dict[str, str]:
@@ -698,10 +951,7 @@ def create_system_message(content: str) -> Dict[str, str]:
     返回:
         dict: 消息对象，包含 role 和 content
     """
-    return {
-        "role": "system",
-        "content": content
-    }
+    return {_KEY_ROLE: _ROLE_SYSTEM, _KEY_CONTENT: content}
 
 
 def create_messages_for_api(
@@ -785,7 +1035,7 @@ if __name__ == '__main__':
         date_info = get_current_datetime()
         print(f"✓ 获取当前时间: {date_info['current_date']}")
         # 测试按需计算（只计算部分占位符）
-        required = ['year_minus_1', 'month_padded', 'three_months_ago']
+        required = frozenset({'year_minus_1', 'month_padded', 'three_months_ago'})
         time_placeholders = builder._calculate_time_placeholders(date_info, required)
         print(f"✓ 按需计算了 {len(time_placeholders)} 个时间占位符:")
         for key, value in time_placeholders.items():